@@ -0,0 +1,161 @@
+"""
+Admission Control
+Bounded queues per endpoint class plus priority work slots, so interactive
+screening stays responsive while large batches are running
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator
+
+
+# Lower value = served first when waiting for a work slot
+LANE_PRIORITY = {"interactive": 0, "batch": 1}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a lane's queue is full; surfaced as 429 with Retry-After"""
+
+    def __init__(self, lane: str, retry_after: int, queued: int):
+        super().__init__(f"{lane} lane is saturated ({queued} queued), retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+        self.queued = queued
+
+
+class Lane:
+    """Concurrency limit with a bounded wait queue for one endpoint class"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.avg_seconds = 0.0  # exponentially weighted request duration
+
+    def retry_after(self) -> int:
+        """Seconds until a queue position is likely to free up"""
+        estimate = self.avg_seconds * (self.queued + 1) / self.max_concurrent
+        return max(1, math.ceil(estimate))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self.semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after(), self.queued)
+
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            elapsed = time.perf_counter() - started
+            self.avg_seconds = elapsed if self.avg_seconds == 0 else 0.8 * self.avg_seconds + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_seconds": round(self.avg_seconds, 4)
+        }
+
+
+class PrioritySlots:
+    """
+    Fixed number of screening work slots shared by all lanes. When slots are
+    busy, waiters are granted in priority order (interactive before batch rows).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters = []  # (priority, sequence, future)
+        self._sequence = itertools.count()
+        self.waiting = {lane: 0 for lane in LANE_PRIORITY}
+
+    async def acquire(self, lane: str):
+        if self.in_use < self.capacity and not self._waiters:
+            self.in_use += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LANE_PRIORITY[lane], next(self._sequence), future))
+        self.waiting[lane] += 1
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was granted just as we were cancelled; give it back
+                self.release()
+            raise
+        finally:
+            self.waiting[lane] -= 1
+
+    def release(self):
+        self.in_use -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to the highest-priority live waiters (cancelled ones are skipped)"""
+        while self.in_use < self.capacity and self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_use += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane: str) -> AsyncIterator[None]:
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "waiting": dict(self.waiting)
+        }
+
+
+class AdmissionController:
+    def __init__(self, lanes: Dict[str, Lane], worker_slots: int):
+        self.lanes = lanes
+        self.slots = PrioritySlots(worker_slots)
+
+    def admit(self, lane: str):
+        """Request-level admission for an endpoint class (raises AdmissionRejected when saturated)"""
+        return self.lanes[lane].admit()
+
+    def slot(self, lane: str):
+        """Work slot for one screening, granted by lane priority"""
+        return self.slots.slot(lane)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+            "slots": self.slots.stats()
+        }
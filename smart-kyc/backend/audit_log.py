@@ -0,0 +1,218 @@
+"""
+Decision Audit Log
+Append-only JSON Lines log of every screening decision (inputs, rules version,
+match evidence). A background writer group-commits records: one write + fsync per
+batch, at most `flush_interval` after the first record is queued. Full segments are
+rotated and gzip-compressed. When the disk falls behind, append() waits for queue
+space (without blocking the event loop) instead of dropping records.
+"""
+
+import glob
+import gzip
+import itertools
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, List, Any, Optional
+
+from group_commit import GroupCommitWriter
+from response_format import dumps
+
+try:
+    import fcntl
+except ImportError:  # Windows: leftover segments are kept uncompressed
+    fcntl = None
+
+
+def _fsync_dir(directory: str):
+    """Make file creation/removal durable (not supported on every platform)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _lock(path: str) -> Optional[int]:
+    """Open and exclusively flock a file; None if another process holds it"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _writer_prefix(segment_path: str) -> str:
+    """audit-<time>-<token>-<n>.jsonl -> audit-<time>-<token>"""
+    return segment_path[:-len(".jsonl")].rsplit("-", 1)[0]
+
+
+def compress_segment(path: str) -> str:
+    """Gzip a closed segment next to itself, then remove the original"""
+    target = path + ".gz"
+    with open(path, "rb") as src, open(target + ".tmp", "wb") as raw:
+        with gzip.GzipFile(filename=os.path.basename(path), mode="wb", fileobj=raw, compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(target + ".tmp", target)
+    os.remove(path)
+    _fsync_dir(os.path.dirname(path) or ".")
+    return target
+
+
+class AuditLog:
+    """
+    Segments are `audit-<start time>-<token>-<n>.jsonl` in `directory`; closed ones become
+    `.jsonl.gz`. Each writer holds a flock on `audit-<start time>-<token>.lock` while it
+    runs, so segments whose lock is free were left by a writer that died and get
+    compressed on the next start. Each record gets a sequence number, so gaps are detectable.
+    With durable=True, append() returns once its record is fsynced; otherwise it returns once
+    queued, and a crash can lose the records of the last `flush_interval`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = 1000,
+        flush_interval: float = 0.05,
+        segment_bytes: int = 64 * 1024 * 1024,
+        queue_size: int = 10000,
+        durable: bool = True
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.durable = durable
+        os.makedirs(directory, exist_ok=True)
+        self._seq = itertools.count(1)
+        # Random token, not the pid: containers restart as the same pid
+        self._prefix = os.path.join(directory, f"audit-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}")
+        self._lock_path = self._prefix + ".lock"
+        self._lock_fd = _lock(self._lock_path) if fcntl is not None else None
+        self._segment_index = 0
+        self._file = None
+        self._segment_path = None
+        self._segment_size = 0
+        self.written = 0
+        self.segments = 0
+        self.last_batch_ms = 0.0
+        self.error = None
+        # Compresses leftovers before the first batch, closes the open segment after the last
+        self._writer = GroupCommitWriter(
+            self._commit, "kyc-audit", batch_size, flush_interval, queue_size,
+            on_start=self._recover, on_stop=self._close_segment
+        )
+        self._writer.start()
+
+    async def append(self, record: Dict[str, Any]):
+        """
+        Queue a record and, if durable, wait until it is on disk. While the writer is a full
+        queue behind, wait for space (other requests keep running).
+        """
+        await self._writer.put(record, wait=self.durable)
+
+    def _recover(self):
+        """Compress segments left by writers that are no longer running (on the writer thread)"""
+        if fcntl is None:
+            return
+        running = {self._prefix}
+        for lock_path in glob.glob(os.path.join(self.directory, "audit-*.lock")):
+            prefix = lock_path[:-len(".lock")]
+            if prefix in running:
+                continue
+            fd = _lock(lock_path)
+            if fd is None:
+                running.add(prefix)  # another worker sharing the directory
+                continue
+            try:
+                for path in sorted(glob.glob(prefix + "-*.jsonl")):
+                    compress_segment(path)
+                os.remove(lock_path)
+            finally:
+                os.close(fd)
+        for path in sorted(glob.glob(os.path.join(self.directory, "audit-*.jsonl"))):
+            if _writer_prefix(path) not in running:
+                compress_segment(path)
+
+    def _open_segment(self):
+        self._segment_index += 1
+        self._segment_path = f"{self._prefix}-{self._segment_index:05d}.jsonl"
+        self._file = open(self._segment_path, "ab")
+        self._segment_size = self._file.tell()
+        self.segments += 1
+        _fsync_dir(self.directory)
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        try:
+            compress_segment(self._segment_path)
+        except Exception as e:
+            # The records are already durable; a later start compresses leftovers
+            print(f"Warning: Could not compress audit segment {self._segment_path}: {e}")
+
+    def _write(self, records: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        if self._file is None:
+            self._open_segment()
+        data = b"".join(dumps(record) + b"\n" for record in records)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._segment_size += len(data)
+        self.written += len(records)
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    def _commit(self, records: List[Dict[str, Any]]):
+        """Write and fsync a batch (on the writer thread), numbering records in queue order"""
+        for record in records:
+            record["seq"] = next(self._seq)
+        while True:
+            try:
+                self._write(records)
+                self.error = None
+                break
+            except Exception as e:
+                # Keep the batch (and the callers waiting behind it) until the disk recovers
+                self.error = str(e)
+                print(f"Warning: Could not write audit records, retrying: {e}")
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                time.sleep(1.0)
+        if self._segment_size >= self.segment_bytes:
+            self._rotate()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._rotate()
+
+    def close(self, timeout: Optional[float] = None):
+        """Write everything queued, compress the open segment and release the lock (blocking)"""
+        stopped = self._writer.close(timeout)
+        if self._lock_fd is not None and stopped:
+            os.remove(self._lock_path)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "durable": self.durable,
+            "queued": self._writer.qsize(),
+            "written": self.written,
+            "batches": self._writer.batches,
+            "segments": self.segments,
+            "stalls": self._writer.stalls,
+            "stalled_seconds": round(self._writer.stalled_seconds, 3),
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "error": self.error
+        }
@@ -0,0 +1,123 @@
+"""
+Screening Executor
+Runs CPU-bound screening work (fuzzy matching, CSV parsing) off the asyncio event loop,
+and measures event-loop lag to show the loop is only doing I/O and orchestration
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+
+# Per-process engine for process-pool workers (opens the same sanctions index/CSV)
+_worker_engine = None
+
+
+def _init_worker():
+    global _worker_engine
+    from pathway_engine import PathwayEngine
+    _worker_engine = PathwayEngine()
+
+
+def _worker_match(name: str, threshold: int, sanctions_version: int) -> Dict[str, Any]:
+    # Follow sanctions reloads in the parent process
+    if _worker_engine.sanctions_version != sanctions_version:
+        _worker_engine.load_sanctions()
+        _worker_engine.sanctions_version = sanctions_version
+    return _worker_engine.fuzzy_match_name(name, threshold)
+
+
+class ScreeningExecutor:
+    """
+    kind="thread": a dedicated thread pool shares the in-process engine.
+    kind="process": fuzzy matching runs in worker processes, each with its own engine
+    (sharing pages when a prebuilt sanctions index is used); other work stays on the thread pool.
+    """
+
+    def __init__(self, pathway_engine, kind: str = "thread", workers: Optional[int] = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}'")
+        self.pathway_engine = pathway_engine
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 4
+        self.threads = ThreadPoolExecutor(self.workers, thread_name_prefix="kyc-cpu")
+        self.processes = ProcessPoolExecutor(self.workers, initializer=_init_worker) if kind == "process" else None
+        self.in_flight = 0
+        self.completed = 0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a thread-safe callable on the dedicated thread pool"""
+        return await self._submit(self.threads, fn, *args)
+
+    async def match_name(self, name: str, threshold: Optional[int] = None) -> Dict[str, Any]:
+        """Fuzzy match a name against the sanctions/PEP lists off the event loop"""
+        if self.processes is None:
+            return await self._submit(self.threads, self.pathway_engine.fuzzy_match_name, name, threshold)
+        if threshold is None:
+            threshold = self.pathway_engine.rule_set().match_threshold()
+        return await self._submit(
+            self.processes, _worker_match, name, threshold, self.pathway_engine.sanctions_version
+        )
+
+    async def _submit(self, pool, fn: Callable, *args) -> Any:
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed
+        }
+
+    def shutdown(self):
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up from a fixed sleep"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.avg_ms = 0.0
+        self.samples = 0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.last_ms = lag_ms
+            self.max_ms = max(self.max_ms, lag_ms)
+            self.avg_ms = lag_ms if self.samples == 0 else 0.9 * self.avg_ms + 0.1 * lag_ms
+            self.samples += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "last_ms": round(self.last_ms, 2),
+            "avg_ms": round(self.avg_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "samples": self.samples
+        }
@@ -3,7 +3,9 @@ Explanation Service
 Generates human-readable explanations for screening decisions and drafts reports
 """
 
-from typing import Dict, Any
+import asyncio
+from string import Template
+from typing import Dict, List, Any, Optional, AsyncIterator
 from datetime import datetime
 
 
@@ -115,31 +117,107 @@ class ExplainService:
         # Medium confidence for rule-based decisions
         return 0.75
     
-    def draft_edd(self, applicant_data: Dict[str, Any]) -> str:
+    def _report_fields(self, applicant_data: Dict[str, Any], report_date: Optional[str] = None) -> Dict[str, Any]:
+        """Collect the values substituted into the EDD/SAR templates"""
+        # Screening results nest identity fields under "applicant"
+        applicant = {**(applicant_data.get("applicant") or {}), **applicant_data}
+        match_result = applicant_data.get("match_result") or {}
+        # Screening results carry the PEP hit in match_result; enriched applicant data has pep_match
+        pep_match = applicant_data.get("pep_match") or (
+            bool(match_result.get("matched")) and match_result.get("list_type") == "PEP"
+        )
+        
+        return {
+            "name": applicant.get("name") or "Unknown",
+            "country": applicant.get("country") or "Unknown",
+            "dob": applicant.get("dob") or "Unknown",
+            "email": applicant.get("email") or "Unknown",
+            "date": report_date or datetime.now().strftime("%Y-%m-%d"),
+            "pep_status": "Match found" if pep_match else "No match",
+            "adverse_media_count": applicant_data.get("adverse_media_count", 0),
+            "sanctions_entity": match_result.get("matched_entity", "No match"),
+            "matched_entity": match_result.get("matched_entity", "N/A"),
+            "match_score": match_result.get("match_score", 0),
+            "list_type": match_result.get("list_type", "N/A"),
+            "source": match_result.get("source", "N/A")
+        }
+    
+    def draft_edd(self, applicant_data: Dict[str, Any], report_date: Optional[str] = None) -> str:
         """Draft Enhanced Due Diligence report"""
-        name = applicant_data.get("name", "Unknown")
-        country = applicant_data.get("country", "Unknown")
+        return EDD_TEMPLATE.substitute(self._report_fields(applicant_data, report_date))
+    
+    def draft_sar(self, applicant_data: Dict[str, Any], report_date: Optional[str] = None) -> str:
+        """Draft Suspicious Activity Report"""
+        return SAR_TEMPLATE.substitute(self._report_fields(applicant_data, report_date))
+    
+    def _resolve_report_type(self, report_type: str, applicant_data: Dict[str, Any]) -> str:
+        """Map "auto" to SAR for blocked cases and EDD otherwise"""
+        if report_type == "auto":
+            return "sar" if applicant_data.get("decision") == "BLOCK" else "edd"
+        return report_type
+    
+    def draft_report(self, report_type: str, applicant_data: Dict[str, Any], report_date: Optional[str] = None) -> str:
+        """
+        Draft a report by type: "edd", "sar", or "auto"
+        (SAR for blocked cases, EDD for everything else)
+        """
+        report_type = self._resolve_report_type(report_type, applicant_data)
         
-        report = f"""
+        if report_type == "edd":
+            return self.draft_edd(applicant_data, report_date)
+        elif report_type == "sar":
+            return self.draft_sar(applicant_data, report_date)
+        else:
+            raise ValueError(f"Unknown report type '{report_type}'")
+    
+    async def draft_reports(
+        self,
+        cases: List[Dict[str, Any]],
+        report_type: str = "auto",
+        batch_size: int = 64
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Render reports for a batch of cases, yielding each one as soon as it is ready.
+        Rendering is a cheap template substitution, so it runs inline; the event loop gets a
+        turn every `batch_size` reports, and memory stays bounded for large batches.
+        """
+        report_date = datetime.now().strftime("%Y-%m-%d")
+        
+        for index, case in enumerate(cases):
+            resolved_type = self._resolve_report_type(report_type, case)
+            applicant = {**(case.get("applicant") or {}), **case}
+            yield {
+                "index": index,
+                "name": applicant.get("name") or "Unknown",
+                "decision": case.get("decision"),
+                "report_type": resolved_type,
+                "report": self.draft_report(resolved_type, case, report_date)
+            }
+            if index % batch_size == batch_size - 1:
+                await asyncio.sleep(0)
+
+
+# Report templates are parsed once at import; draft_* only substitute values
+EDD_TEMPLATE = Template("""
 # Enhanced Due Diligence Report
 
-**Subject:** {name}  
-**Date:** {datetime.now().strftime("%Y-%m-%d")}  
+**Subject:** $name  
+**Date:** $date  
 **Prepared By:** Smart KYC Screener (Automated)
 
 ## Executive Summary
-This Enhanced Due Diligence (EDD) report has been prepared for {name} following automated Level-1 screening that flagged potential risk factors requiring additional review.
+This Enhanced Due Diligence (EDD) report has been prepared for $name following automated Level-1 screening that flagged potential risk factors requiring additional review.
 
 ## Screening Results
-- **Sanctions Screening:** {applicant_data.get('match_result', {}).get('matched_entity', 'No match')}
-- **PEP Screening:** {'Match found' if applicant_data.get('pep_match') else 'No match'}
-- **Adverse Media:** {applicant_data.get('adverse_media_count', 0)} article(s) found
-- **Jurisdiction:** {country}
+- **Sanctions Screening:** $sanctions_entity
+- **PEP Screening:** $pep_status
+- **Adverse Media:** $adverse_media_count article(s) found
+- **Jurisdiction:** $country
 
 ## Risk Assessment
 Based on automated screening, the following risk factors were identified:
-- Match score: {applicant_data.get('match_result', {}).get('match_score', 0)}%
-- List type: {applicant_data.get('match_result', {}).get('list_type', 'N/A')}
+- Match score: $match_score%
+- List type: $list_type
 
 ## Recommendations
 1. Verify identity through additional documentation
@@ -155,37 +233,32 @@ Based on automated screening, the following risk factors were identified:
 
 ---
 *This report was generated automatically by Smart KYC Screener. Manual review required.*
-"""
-        return report.strip()
-    
-    def draft_sar(self, applicant_data: Dict[str, Any]) -> str:
-        """Draft Suspicious Activity Report"""
-        name = applicant_data.get("name", "Unknown")
-        
-        report = f"""
+""".strip())
+
+SAR_TEMPLATE = Template("""
 # Suspicious Activity Report (SAR) - DRAFT
 
-**Report Date:** {datetime.now().strftime("%Y-%m-%d")}  
-**Subject:** {name}  
+**Report Date:** $date  
+**Subject:** $name  
 **Status:** DRAFT - REQUIRES REVIEW
 
 ## Part I - Subject Information
-**Name:** {name}  
-**Country:** {applicant_data.get('country', 'Unknown')}  
-**Date of Birth:** {applicant_data.get('dob', 'Unknown')}  
-**Email:** {applicant_data.get('email', 'Unknown')}
+**Name:** $name  
+**Country:** $country  
+**Date of Birth:** $dob  
+**Email:** $email
 
 ## Part II - Suspicious Activity
 The following suspicious indicators were identified during automated KYC screening:
 
 ### Sanctions/PEP Match
-- **Matched Entity:** {applicant_data.get('match_result', {}).get('matched_entity', 'N/A')}
-- **Match Score:** {applicant_data.get('match_result', {}).get('match_score', 0)}%
-- **List Type:** {applicant_data.get('match_result', {}).get('list_type', 'N/A')}
-- **Source:** {applicant_data.get('match_result', {}).get('source', 'N/A')}
+- **Matched Entity:** $matched_entity
+- **Match Score:** $match_score%
+- **List Type:** $list_type
+- **Source:** $source
 
 ### Adverse Media
-- **Articles Found:** {applicant_data.get('adverse_media_count', 0)}
+- **Articles Found:** $adverse_media_count
 - **Topics:** Sanctions violations, money laundering (see attached)
 
 ## Part III - Analysis
@@ -199,5 +272,4 @@ Automated screening flagged this individual due to:
 
 ---
 *DRAFT ONLY - This SAR draft was generated automatically. Compliance officer must review, verify, and complete before filing.*
-"""
-        return report.strip()
+""".strip())
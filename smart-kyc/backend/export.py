@@ -0,0 +1,138 @@
+"""
+Result Export
+Flattens batch screening results into a columnar table (Parquet / Arrow IPC, CSV fallback)
+"""
+
+import csv
+import io
+from typing import Dict, List, Any, Tuple
+
+
+def _load_pyarrow():
+    """Import pyarrow on first export; it is optional and slow to import"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow, pyarrow.parquet
+    except ImportError:  # CSV export still works without it
+        return None, None
+
+
+# Flat column layout, one row per screened applicant
+EXPORT_COLUMNS = [
+    "name",
+    "email",
+    "country",
+    "dob",
+    "decision",
+    "rule_id",
+    "rule_outcome",
+    "rule_priority",
+    "matched",
+    "match_score",
+    "matched_entity",
+    "list_type",
+    "source",
+    "match_country",
+    "adverse_media_count",
+    "confidence",
+    "timestamp"
+]
+
+# Low-cardinality string columns stored as dictionary-encoded arrays
+DICTIONARY_COLUMNS = {"country", "decision", "rule_id", "rule_outcome", "list_type", "source", "match_country"}
+
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+    "csv": ("text/csv", "csv")
+}
+
+
+def flatten_results(results: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Convert nested screening results into column lists"""
+    columns = {name: [] for name in EXPORT_COLUMNS}
+
+    for result in results:
+        applicant = result.get("applicant") or {}
+        rule = result.get("triggered_rule") or {}
+        match = result.get("match_result") or {}
+        explanation = result.get("explanation") or {}
+
+        columns["name"].append(applicant.get("name"))
+        columns["email"].append(applicant.get("email"))
+        columns["country"].append(applicant.get("country"))
+        columns["dob"].append(applicant.get("dob"))
+        columns["decision"].append(result.get("decision"))
+        columns["rule_id"].append(rule.get("id", "unknown"))
+        columns["rule_outcome"].append(rule.get("outcome"))
+        columns["rule_priority"].append(rule.get("priority"))
+        columns["matched"].append(bool(match.get("matched", False)))
+        columns["match_score"].append(match.get("match_score", 0))
+        columns["matched_entity"].append(match.get("matched_entity"))
+        columns["list_type"].append(match.get("list_type"))
+        columns["source"].append(match.get("source"))
+        columns["match_country"].append(match.get("country"))
+        columns["adverse_media_count"].append(result.get("adverse_media_count", 0))
+        columns["confidence"].append(explanation.get("confidence"))
+        columns["timestamp"].append(result.get("timestamp"))
+
+    return columns
+
+
+def _to_text(value: Any) -> Any:
+    """Normalise values that pandas may hand us (NaN, numpy scalars) for string columns"""
+    if value is None or value != value:
+        return None
+    return str(value)
+
+
+def _build_table(pa, columns: Dict[str, List[Any]]):
+    """Build an Arrow table with dictionary-encoded categorical columns"""
+    arrays = []
+    for name in EXPORT_COLUMNS:
+        values = columns[name]
+        if name == "matched":
+            array = pa.array(values, type=pa.bool_())
+        elif name in ("rule_priority", "match_score", "adverse_media_count"):
+            array = pa.array([None if v is None else int(v) for v in values], type=pa.int32())
+        elif name == "confidence":
+            array = pa.array(values, type=pa.float32())
+        else:
+            array = pa.array([_to_text(v) for v in values], type=pa.string())
+            if name in DICTIONARY_COLUMNS:
+                array = array.dictionary_encode()
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, names=EXPORT_COLUMNS)
+
+
+def _write_csv(columns: Dict[str, List[Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(zip(*(columns[name] for name in EXPORT_COLUMNS)))
+    return buffer.getvalue().encode("utf-8")
+
+
+def export_results(results: List[Dict[str, Any]], fmt: str = "parquet") -> Tuple[bytes, str]:
+    """
+    Serialize results as a flat table.
+    Returns (payload, format actually used); falls back to CSV when pyarrow is missing.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+
+    columns = flatten_results(results)
+    pa, pq = _load_pyarrow() if fmt != "csv" else (None, None)
+
+    if pa is None:
+        return _write_csv(columns), "csv"
+
+    table = _build_table(pa, columns)
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes(), fmt
@@ -0,0 +1,149 @@
+"""
+Group Commit Writer
+Background thread that commits queued items in batches (one transaction / write + fsync per
+batch), shared by the audit log and the screening history store. Producers on the event loop
+wait for queue space without blocking the loop, and can wait for their batch to be committed.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import List, Any, Callable, Optional
+
+
+_CLOSE = object()
+
+
+def _resolve(future: asyncio.Future, error: Optional[BaseException]):
+    # Runs on the future's loop; the waiter may have been cancelled meanwhile
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+class GroupCommitWriter:
+    """
+    Calls `commit(items)` on a writer thread with up to `batch_size` items: the first queued item
+    plus whatever arrives within `flush_interval` of it. `on_start` runs on the thread before the
+    first batch, `on_stop` after the last one. An exception from commit is reported to the
+    producers waiting for that batch (and printed); the writer keeps going.
+    """
+
+    def __init__(
+        self,
+        commit: Callable[[List[Any]], None],
+        name: str,
+        batch_size: int = 1000,
+        flush_interval: float = 0.05,
+        queue_size: int = 10000,
+        on_start: Optional[Callable[[], None]] = None,
+        on_stop: Optional[Callable[[], None]] = None
+    ):
+        self.commit = commit
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_start = on_start
+        self.on_stop = on_stop
+        # (item, future or None) pairs
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        # Items handed to / processed by the writer, for flush()
+        self._enqueued = 0
+        self._processed = 0
+        self._processed_changed = threading.Condition()
+        self.batches = 0
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+
+    def start(self):
+        """Start the writer thread (again, if it has stopped)"""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, item: Any, wait: bool = False):
+        """
+        Queue an item; while the writer is a full queue behind, wait (other requests keep running).
+        With wait=True, return only once the batch holding the item is committed (raising its error).
+        """
+        if self._queue.full():
+            started = time.perf_counter()
+            self.stalls += 1
+            while self._queue.full():
+                await asyncio.sleep(self.flush_interval or 0.01)
+            self.stalled_seconds += time.perf_counter() - started
+        future = asyncio.get_running_loop().create_future() if wait else None
+        # Only the event loop puts, so the space seen above is still there
+        self._queue.put_nowait((item, future))
+        self._enqueued += 1
+        if future is not None:
+            await future
+
+    def _collect(self, first) -> list:
+        """Group the first entry with whatever arrives within the flush interval"""
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _CLOSE:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        if self.on_start is not None:
+            try:
+                self.on_start()
+            except Exception as e:
+                print(f"Warning: {self.name} start-up failed: {e}")
+        closing = False
+        while not closing:
+            batch = self._collect(self._queue.get())
+            closing = batch[-1] is _CLOSE
+            entries = [entry for entry in batch if entry is not _CLOSE]
+            error = None
+            if entries:
+                try:
+                    self.commit([item for item, _ in entries])
+                    self.batches += 1
+                except Exception as e:
+                    error = e
+                    print(f"Warning: {self.name} could not commit {len(entries)} item(s): {e}")
+            for _, future in entries:
+                if future is not None:
+                    future.get_loop().call_soon_threadsafe(_resolve, future, error)
+            with self._processed_changed:
+                self._processed += len(entries)
+                self._processed_changed.notify_all()
+        if self.on_stop is not None:
+            self.on_stop()
+
+    def flush(self):
+        """Block until the items queued before this call are committed (not later ones)"""
+        if self._thread is None:
+            return
+        target = self._enqueued
+        with self._processed_changed:
+            self._processed_changed.wait_for(lambda: self._processed >= target or not self._thread.is_alive())
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Commit everything queued and stop the thread (blocking); True once it has stopped"""
+        if self.running:
+            self._queue.put(_CLOSE)
+            self._thread.join(timeout)
+        return not self.running
@@ -0,0 +1,228 @@
+"""
+Screening History Store
+Persists screening results in a local SQLite database (WAL mode) with indexed,
+paginated queries for the analyst UI. Writes go through a background writer that
+groups them into one transaction per batch, off the event loop.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
+
+from group_commit import GroupCommitWriter
+from sanctions_index import normalize_name
+from records import to_plain
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS screenings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT,
+    name TEXT,
+    name_norm TEXT,
+    email TEXT,
+    country TEXT,
+    dob TEXT,
+    decision TEXT,
+    rule_id TEXT,
+    rule_set TEXT,
+    match_score INTEGER,
+    matched_entity TEXT,
+    list_type TEXT,
+    adverse_media_count INTEGER,
+    timestamp TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_screenings_decision ON screenings (decision, id);
+CREATE INDEX IF NOT EXISTS idx_screenings_rule_id ON screenings (rule_id, id);
+CREATE INDEX IF NOT EXISTS idx_screenings_country ON screenings (country, id);
+CREATE INDEX IF NOT EXISTS idx_screenings_name ON screenings (name_norm);
+CREATE INDEX IF NOT EXISTS idx_screenings_timestamp ON screenings (timestamp);
+CREATE INDEX IF NOT EXISTS idx_screenings_job_id ON screenings (job_id, id);
+"""
+
+SUMMARY_COLUMNS = [
+    "id", "job_id", "name", "email", "country", "dob", "decision", "rule_id", "rule_set",
+    "match_score", "matched_entity", "list_type", "adverse_media_count", "timestamp"
+]
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or value != value:
+        return None
+    return str(value)
+
+
+class HistoryStore:
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.05, queue_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # Commits (result, job_id) rows in the background; started on first use
+        self._writer = GroupCommitWriter(self._insert, "kyc-history", batch_size, flush_interval, queue_size)
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            conn.commit()
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add columns missing from databases created by older versions"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(screenings)")}
+        if "rule_set" not in columns:
+            conn.execute("ALTER TABLE screenings ADD COLUMN rule_set TEXT")
+            try:
+                conn.execute("UPDATE screenings SET rule_set = json_extract(result, '$.rule_set')")
+            except sqlite3.OperationalError as e:
+                # SQLite without JSON1: old rows keep rule_set NULL
+                print(f"Warning: Could not backfill rule_set in screening history: {e}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside the writer"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row(self, result: Dict[str, Any], job_id: Optional[str]) -> tuple:
+        applicant = result.get("applicant") or {}
+        rule = result.get("triggered_rule") or {}
+        match = result.get("match_result") or {}
+        name = _text(applicant.get("name"))
+        return (
+            job_id,
+            name,
+            normalize_name(name) if name else None,
+            _text(applicant.get("email")),
+            _text(applicant.get("country")),
+            _text(applicant.get("dob")),
+            result.get("decision"),
+            rule.get("id", "unknown"),
+            result.get("rule_set"),
+            match.get("match_score"),
+            match.get("matched_entity"),
+            match.get("list_type"),
+            result.get("adverse_media_count"),
+            result.get("timestamp"),
+            json.dumps(to_plain(result), default=str)
+        )
+
+    def _insert(self, items: Sequence[Tuple[Dict[str, Any], Optional[str]]]):
+        """Insert (result, job_id) rows in one transaction"""
+        with self._write_lock:
+            with self._connection() as conn:
+                conn.executemany(
+                    "INSERT INTO screenings (job_id, name, name_norm, email, country, dob, decision, rule_id, rule_set, "
+                    "match_score, matched_entity, list_type, adverse_media_count, timestamp, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self._row(result, job_id) for result, job_id in items]
+                )
+
+    def record_many(self, results: List[Dict[str, Any]], job_id: Optional[str] = None):
+        """Insert results in batched transactions (blocking; the service uses enqueue)"""
+        for start in range(0, len(results), self.batch_size):
+            self._insert([(result, job_id) for result in results[start:start + self.batch_size]])
+
+    async def enqueue(self, results: Sequence[Dict[str, Any]], job_id: Optional[str] = None):
+        """
+        Hand results to the background writer. Rows from concurrent requests are grouped into
+        one transaction per batch_size rows or flush_interval. Waits (without blocking the
+        event loop) while the writer is a full queue behind.
+        """
+        self._writer.start()
+        for result in results:
+            await self._writer.put((result, job_id))
+
+    def flush(self):
+        """Block until the rows queued before this call are written (not later ones)"""
+        self._writer.flush()
+
+    def close(self):
+        """Write everything queued and stop the writer (blocking)"""
+        self._writer.close()
+
+    def query(
+        self,
+        decision: Optional[str] = None,
+        rule_id: Optional[str] = None,
+        country: Optional[str] = None,
+        name: Optional[str] = None,
+        job_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Newest-first page of screenings matching the filters. `name` is a prefix match on the
+        normalized name; pass the returned next_cursor to get the following page.
+        Includes screenings still queued for the writer (blocking).
+        """
+        self.flush()
+        clauses, params = [], []
+        for column, value in (("decision", decision), ("rule_id", rule_id), ("country", country), ("job_id", job_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if name:
+            # Range scan keeps the prefix search on the name index
+            prefix = normalize_name(name)
+            clauses.append("name_norm >= ? AND name_norm < ?")
+            params.extend([prefix, prefix + "\uffff"])
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM screenings {where} ORDER BY id DESC LIMIT ?",
+            [*params, limit + 1]
+        ).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        return {
+            "items": items,
+            "next_cursor": items[-1]["id"] if len(rows) > limit else None
+        }
+
+    def get(self, screening_id: int) -> Optional[Dict[str, Any]]:
+        """Full stored result for one screening (blocking)"""
+        self.flush()
+        row = self._connection().execute(
+            "SELECT id, job_id, result FROM screenings WHERE id = ?", (screening_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": row["id"], "job_id": row["job_id"], **json.loads(row["result"])}
+
+    def job_results(self, job_id: str) -> Optional[List[Dict[str, Any]]]:
+        """All results of a batch job in original order, or None if unknown (blocking)"""
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT result FROM screenings WHERE job_id = ? ORDER BY id", (job_id,)
+        ).fetchall()
+        if not rows:
+            return None
+        return [json.loads(row["result"]) for row in rows]
+
+    def iter_screenings(self, after_id: int = 0) -> Iterator[Dict[str, Any]]:
+        """Summary rows with id > after_id in insertion order (streamed, for incremental indexes)"""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)}, name_norm FROM screenings "
+            "WHERE id > ? AND name_norm IS NOT NULL ORDER BY id",
+            (after_id,)
+        )
+        for row in rows:
+            yield dict(row)
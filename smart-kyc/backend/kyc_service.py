@@ -3,33 +3,182 @@ KYC Service
 Orchestrates screening workflow across all components
 """
 
-import pandas as pd
+import asyncio
 import io
-from typing import Dict, List, Any
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Dict, List, Any, Optional, Tuple
 from fastapi import UploadFile
 
+from sanctions_index import normalize_name
+from rescreen import CustomerIndex, rescreen_delta
+from records import Applicant, EnrichedApplicant, ScreeningResult, ResultBatch
+
 
 class KYCService:
-    def __init__(self, pathway_engine, landing_ai, adverse_media, explain_service):
+    def __init__(
+        self,
+        pathway_engine,
+        landing_ai,
+        adverse_media,
+        explain_service,
+        history_store=None,
+        admission=None,
+        executor=None
+    ):
         self.pathway_engine = pathway_engine
         self.landing_ai = landing_ai
         self.adverse_media = adverse_media
         self.explain_service = explain_service
+        self.history_store = history_store
+        self.admission = admission
+        # CPU-bound work (CSV parsing, fuzzy matching) runs here instead of on the event loop
+        self.executor = executor
+        # Single-flight: identical concurrent screenings share one computation
+        self._in_flight = {}
+        # Recent batch results by job id, oldest evicted first
+        self.jobs = OrderedDict()
+        self.max_jobs = int(os.getenv("KYC_MAX_JOBS", 20))
+        # Stored customers by name, for delta re-screening when sanctions entries change
+        self.customer_index = CustomerIndex()
+        self._customer_lock = threading.Lock()
     
-    async def process_csv(self, file: UploadFile) -> List[Dict[str, Any]]:
-        """Process CSV file with applicants"""
+    async def process_csv(self, file: UploadFile, rule_set: Optional[str] = None) -> Tuple[ResultBatch, Dict[str, Any]]:
+        """Process CSV file with applicants, returning (results, batch summary)"""
         content = await file.read()
+        if self.executor is not None:
+            rows = await self.executor.run(self._parse_csv, content)
+        else:
+            rows = self._parse_csv(content)
+        return await self.screen_batch(rows, rule_set)
+    
+    def _parse_csv(self, content: bytes) -> List[Dict[str, Any]]:
+        import pandas as pd
+        
         df = pd.read_csv(io.BytesIO(content))
+        return [row.to_dict() for _, row in df.iterrows()]
+    
+    async def screen_batch(
+        self,
+        rows: List[Dict[str, Any]],
+        rule_set: Optional[str] = None
+    ) -> Tuple[ResultBatch, Dict[str, Any]]:
+        """
+        Screen a batch, running the pipeline once per unique applicant key and
+        fanning the result back out to every duplicate row
+        """
+        key_fields = self._dedup_fields(self.pathway_engine.rule_set(rule_set))
+        screened = {}
+        results = ResultBatch()
         
-        results = []
-        for _, row in df.iterrows():
-            applicant_data = row.to_dict()
-            result = await self.screen_applicant(applicant_data)
-            results.append(result)
+        for applicant_data in rows:
+            key = self._dedup_key(applicant_data, key_fields)
+            shared = screened.get(key)
+            if shared is None:
+                result = await self.screen_applicant(applicant_data, lane="batch", rule_set=rule_set)
+                screened[key] = result
+                results.append(result)
+            else:
+                # Same decision, but every row still counts in the metrics and the audit log
+                self.pathway_engine.record_decision(shared.decision, shared.rule_id, applicant_data.get("country"))
+                await self.pathway_engine.audit_decision(applicant_data, shared)
+                results.append(shared, Applicant.from_data(applicant_data))
         
-        return results
+        total = len(rows)
+        unique = len(screened)
+        summary = {
+            "rows": total,
+            "unique_applicants": unique,
+            "duplicates": total - unique,
+            "dedup_ratio": round((total - unique) / total, 4) if total > 0 else 0
+        }
+        return results, summary
+    
+    def _dedup_fields(self, program) -> List[str]:
+        """Applicant fields that can change a decision: anything rules read, plus country (used in explanations)"""
+        fields = {"country"}
+        for rule in program.rules_config.get("rules", []):
+            for condition in rule.get("conditions", []):
+                fields.add(condition.get("field"))
+        # Match-derived fields are computed from the name, so the name key already covers them
+        return sorted(field for field in fields.difference(EnrichedApplicant.DERIVED) if field)
+    
+    def _dedup_key(self, applicant_data: Dict[str, Any], key_fields: List[str]) -> tuple:
+        values = []
+        for field in key_fields:
+            value = applicant_data.get(field)
+            if value is None or value != value:  # missing or NaN
+                value = None
+            elif isinstance(value, list):
+                value = tuple(value)
+            values.append(value)
+        return (normalize_name(applicant_data.get("name", "")), *values)
+    
+    def _flight_key(self, applicant_data: Dict[str, Any], program) -> Optional[tuple]:
+        """Normalized payload plus rule set/sanctions versions, or None if the payload can't be keyed"""
+        items = []
+        for field, value in applicant_data.items():
+            if field == "adverse_media_count":
+                continue  # always recomputed from the name
+            if field == "name":
+                value = normalize_name(value or "")
+            elif value is None or value != value:
+                value = None
+            elif isinstance(value, list):
+                value = tuple(value)
+            items.append((field, value))
+        key = (program.name, program.version, self.pathway_engine.sanctions_version, *sorted(items, key=lambda item: item[0]))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    
+    async def screen_applicant(
+        self,
+        applicant_data: Dict[str, Any],
+        lane: str = "interactive",
+        rule_set: Optional[str] = None
+    ) -> ScreeningResult:
+        """
+        Screen a single applicant. Concurrent requests with the same normalized payload (and the
+        same rule set/sanctions versions) join one in-flight computation and each get their own response.
+        `lane` sets the work-slot priority: interactive requests go ahead of batch rows.
+        `rule_set` selects a named rule set (default: rules.yaml).
+        """
+        program = self.pathway_engine.rule_set(rule_set)
+        key = self._flight_key(applicant_data, program)
+        if key is None:
+            return await self._screen_in_slot(applicant_data, lane, program.name)
+        
+        flight = self._in_flight.get(key)
+        joined = flight is not None
+        if not joined:
+            flight = asyncio.ensure_future(self._screen_in_slot(applicant_data, lane, program.name))
+            self._in_flight[key] = flight
+            flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        
+        # Shielded so one caller disconnecting doesn't cancel the shared computation
+        shared = await asyncio.shield(flight)
+        if not joined:
+            return shared
+        
+        # The shared computation counted once; count (and audit) this request too
+        self.pathway_engine.record_decision(shared.decision, shared.rule_id, applicant_data.get("country"))
+        await self.pathway_engine.audit_decision(applicant_data, shared)
+        applicant_data["adverse_media_count"] = shared.adverse_media_count
+        return shared.with_applicant(Applicant.from_data(applicant_data))
+    
+    async def _screen_in_slot(self, applicant_data: Dict[str, Any], lane: str, rule_set: str) -> ScreeningResult:
+        if self.admission is None:
+            return await self._screen_applicant(applicant_data, rule_set)
+        async with self.admission.slot(lane):
+            return await self._screen_applicant(applicant_data, rule_set)
     
-    async def screen_applicant(self, applicant_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _screen_applicant(self, applicant_data: Dict[str, Any], rule_set: Optional[str] = None) -> ScreeningResult:
         """Screen a single applicant through the full workflow"""
         
         # Get adverse media count
@@ -37,28 +186,81 @@ class KYCService:
         adverse_count = self.adverse_media.get_adverse_count(name)
         applicant_data["adverse_media_count"] = adverse_count
         
+        # Fuzzy matching is the expensive part; rule evaluation and metrics stay on the loop
+        match_result = None
+        if self.executor is not None:
+            threshold = self.pathway_engine.rule_set(rule_set).match_threshold()
+            match_result = await self.executor.match_name(name, threshold)
+        
         # Run through pathway engine
-        screening_result = self.pathway_engine.evaluate_rules(applicant_data)
+        screening_result = self.pathway_engine.evaluate_rules(applicant_data, match_result, rule_set)
+        await self.pathway_engine.audit_decision(applicant_data, screening_result)
         
         # Generate explanation
         explanation = self.explain_service.explain_decision(screening_result)
         
-        # Combine results
-        return {
-            "applicant": {
-                "name": applicant_data.get("name"),
-                "email": applicant_data.get("email"),
-                "country": applicant_data.get("country"),
-                "dob": applicant_data.get("dob")
-            },
-            "decision": screening_result["decision"],
-            "triggered_rule": screening_result["triggered_rule"],
-            "match_result": screening_result["match_result"],
-            "adverse_media_count": adverse_count,
-            "explanation": explanation,
-            "timestamp": screening_result["timestamp"]
-        }
+        # Combine results (rule and match are shared by reference)
+        return ScreeningResult(
+            Applicant.from_data(applicant_data),
+            screening_result.decision,
+            screening_result.triggered_rule,
+            screening_result.match_result,
+            adverse_count,
+            explanation,
+            screening_result.rule_set,
+            screening_result.rules_version,
+            screening_result.timestamp
+        )
+    
+    async def register_job(self, results: Sequence[Mapping[str, Any]]) -> str:
+        """Keep batch results addressable by job id (for bulk report drafting)"""
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = results
+        while len(self.jobs) > self.max_jobs:
+            self.jobs.popitem(last=False)
+        await self.record_history(results, job_id)
+        return job_id
+    
+    async def get_job(self, job_id: str) -> Optional[Sequence[Mapping[str, Any]]]:
+        """
+        Get results of a previous batch, or None if unknown. Once evicted from memory they are
+        read (and decoded) from the history store off the event loop.
+        """
+        results = self.jobs.get(job_id)
+        if results is None and self.history_store is not None:
+            results = await asyncio.to_thread(self.history_store.job_results, job_id)
+        return results
+    
+    async def record_history(self, results: Sequence[Mapping[str, Any]], job_id: Optional[str] = None):
+        """Persist screening results (written in the background) if a history store is configured"""
+        if self.history_store is None:
+            return
+        try:
+            await self.history_store.enqueue(results, job_id)
+        except Exception as e:
+            print(f"Warning: Could not record screening history: {e}")
+    
+    def rescreen_delta(
+        self,
+        entities: List[Dict[str, Any]],
+        removed: Optional[List[Dict[str, Any]]] = None,
+        rule_set: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Customers from the screening history whose decision changes with these sanctions entries (blocking)"""
+        if self.history_store is None:
+            raise ValueError("Delta re-screening needs the screening history store (set SQLITE_PATH)")
+        for entity in [*entities, *(removed or [])]:
+            if not entity.get("name"):
+                raise ValueError("Every sanctions entry needs a 'name'")
+        with self._customer_lock:
+            self.history_store.flush()  # include screenings still queued for the writer
+            self.customer_index.refresh(self.history_store)
+            return rescreen_delta(self.pathway_engine, self.customer_index, entities, removed, rule_set)
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get current metrics"""
         return self.pathway_engine.get_metrics()
+    
+    def get_window_metrics(self, windows: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get rolling-window metrics"""
+        return self.pathway_engine.get_window_metrics(windows)
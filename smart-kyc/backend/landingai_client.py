@@ -4,12 +4,8 @@ Extracts structured fields from identity documents with grounded evidence (bound
 """
 
 import os
-import requests
 from typing import Dict, Any
 from fastapi import UploadFile
-import base64
-from PIL import Image
-import io
 
 
 class LandingAIClient:
@@ -38,6 +34,7 @@ class LandingAIClient:
     
     async def _call_landing_ai_api(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Call actual Landing AI ADE (Automated Document Extraction) API"""
+        import requests
         
         # Prepare multipart form data
         files = {
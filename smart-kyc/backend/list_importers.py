@@ -0,0 +1,220 @@
+"""
+Sanctions List Importers
+Stream-parses official list formats (OFAC SDN XML, UN consolidated XML, EU
+consolidated CSV) into sanctions entities with bounded memory, for the
+in-memory SanctionsList or a prebuilt index
+
+Build an index from official files:
+    python list_importers.py data/sanctions.idx ofac:sdn.xml un:consolidated.xml eu:eu_fsf.csv
+"""
+
+import csv
+import functools
+import sys
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from sanctions_index import SanctionsList, build_index, iter_csv_entities, open_index
+
+
+@functools.lru_cache(maxsize=512)  # a list format only uses a few dozen distinct tags
+def _local(tag: str) -> str:
+    """Tag without its XML namespace (OFAC files are namespaced, UN files are not)"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem, name: str) -> str:
+    """Text of the first direct child with this local name"""
+    for child in elem:
+        if _local(child.tag) == name:
+            return (child.text or "").strip()
+    return ""
+
+
+def _children(elem, *path: str) -> Iterator:
+    """Descendants along a path of local names, e.g. ("akaList", "aka")"""
+    if not path:
+        yield elem
+        return
+    for child in elem:
+        if _local(child.tag) == path[0]:
+            yield from _children(child, *path[1:])
+
+
+def _join(*parts: str) -> str:
+    return " ".join(part for part in parts if part)
+
+
+def _unique(names: List[str], exclude: str) -> List[str]:
+    seen = {exclude.lower()}
+    unique = []
+    for name in names:
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            unique.append(name)
+    return unique
+
+
+def _iter_records(path: str, *record_tags: str) -> Iterator:
+    """
+    Yield each complete record element, then clear it and everything already
+    parsed under its parent, so memory does not grow with the file size
+    """
+    stack = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if _local(elem.tag) in record_tags:
+            yield elem
+            elem.clear()
+            if stack:
+                stack[-1].clear()
+
+
+def iter_ofac_sdn_xml(path: str) -> Iterator[Dict[str, Any]]:
+    """Entities from the OFAC SDN list (sdn.xml / SDN.XML)"""
+    for entry in _iter_records(path, "sdnEntry"):
+        name = _join(_text(entry, "firstName"), _text(entry, "lastName"))
+        if not name:
+            continue
+        aliases = [_join(_text(aka, "firstName"), _text(aka, "lastName")) for aka in _children(entry, "akaList", "aka")]
+        countries = [
+            _text(item, "country")
+            for path in (("nationalityList", "nationality"), ("citizenshipList", "citizenship"), ("addressList", "address"))
+            for item in _children(entry, *path)
+        ]
+        yield {
+            "id": f"OFAC-{_text(entry, 'uid')}",
+            "name": name,
+            "aliases": _unique(aliases, name),
+            "country": next((country for country in countries if country), "UNKNOWN"),
+            "source": "OFAC",
+            "list_type": "SANCTIONS"
+        }
+
+
+def iter_un_xml(path: str) -> Iterator[Dict[str, Any]]:
+    """Individuals and entities from the UN Security Council consolidated list (consolidated.xml)"""
+    for record in _iter_records(path, "INDIVIDUAL", "ENTITY"):
+        individual = _local(record.tag) == "INDIVIDUAL"
+        if individual:
+            name = _join(*(_text(record, field) for field in ("FIRST_NAME", "SECOND_NAME", "THIRD_NAME", "FOURTH_NAME")))
+            alias_path, address_path = "INDIVIDUAL_ALIAS", "INDIVIDUAL_ADDRESS"
+        else:
+            name = _text(record, "FIRST_NAME")
+            alias_path, address_path = "ENTITY_ALIAS", "ENTITY_ADDRESS"
+        if not name:
+            continue
+        aliases = [_text(alias, "ALIAS_NAME") for alias in _children(record, alias_path)]
+        countries = [_text(value, "VALUE") for value in _children(record, "NATIONALITY")]
+        countries += [_text(address, "COUNTRY") for address in _children(record, address_path)]
+        yield {
+            "id": f"UN-{_text(record, 'REFERENCE_NUMBER') or _text(record, 'DATAID')}",
+            "name": name,
+            "aliases": _unique(aliases, name),
+            "country": next((country for country in countries if country), "UNKNOWN"),
+            "source": "UN",
+            "list_type": "SANCTIONS"
+        }
+
+
+def iter_eu_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Entities from the EU consolidated financial sanctions CSV (csvFullSanctionsList_1_1,
+    `;`-separated). The file has one row per name/citizenship/address, grouped by
+    Entity_LogicalId, so only the current entity's rows are held at a time.
+    """
+    current_id, entity = None, None
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = [column.strip().lower() for column in next(reader, [])]
+        column = {name: i for i, name in enumerate(header)}
+        required = ("entity_logicalid", "namealias_wholename")
+        if any(name not in column for name in required):
+            raise ValueError(f"{path} is not an EU sanctions CSV (missing {', '.join(required)})")
+
+        def field(row: List[str], name: str) -> str:
+            i = column.get(name)
+            return row[i].strip() if i is not None and i < len(row) else ""
+
+        for row in reader:
+            logical_id = field(row, "entity_logicalid")
+            if not logical_id:
+                continue
+            if logical_id != current_id:
+                if entity is not None and entity["name"]:
+                    entity["aliases"] = _unique(entity["aliases"], entity["name"])
+                    yield entity
+                current_id = logical_id
+                entity = {
+                    "id": f"EU-{logical_id}",
+                    "name": "",
+                    "aliases": [],
+                    "country": "UNKNOWN",
+                    "source": "EU",
+                    "list_type": "SANCTIONS"
+                }
+            whole_name = field(row, "namealias_wholename")
+            if whole_name:
+                if entity["name"]:
+                    entity["aliases"].append(whole_name)
+                else:
+                    entity["name"] = whole_name
+            if entity["country"] == "UNKNOWN":
+                country = field(row, "citizenship_countrydescription") or field(row, "address_countrydescription")
+                if country:
+                    entity["country"] = country
+
+    if entity is not None and entity["name"]:
+        entity["aliases"] = _unique(entity["aliases"], entity["name"])
+        yield entity
+
+
+IMPORTERS = {
+    "ofac": iter_ofac_sdn_xml,
+    "un": iter_un_xml,
+    "eu": iter_eu_csv,
+    "csv": iter_csv_entities
+}
+
+
+def parse_sources(spec: str) -> List[Tuple[str, str]]:
+    """Parse "ofac:sdn.xml,un:consolidated.xml" into [("ofac", "sdn.xml"), ("un", "consolidated.xml")]"""
+    sources = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        fmt, sep, path = item.strip().partition(":")
+        if not sep or fmt not in IMPORTERS:
+            raise ValueError(f"Invalid sanctions source '{item}' (expected one of {', '.join(IMPORTERS)} as format:path)")
+        sources.append((fmt, path))
+    return sources
+
+
+def iter_sources(sources: List[Tuple[str, str]]) -> Iterator[Dict[str, Any]]:
+    """Entities from every source in order"""
+    for fmt, path in sources:
+        yield from IMPORTERS[fmt](path)
+
+
+def open_sources(sources: List[Tuple[str, str]], index_path: Optional[str] = None):
+    """
+    Same as open_sanctions, for official list files: the prebuilt index when it was built
+    from exactly these files (unchanged since), otherwise stream the sources into memory
+    """
+    index = open_index(index_path, sources)
+    return index if index is not None else SanctionsList(iter_sources(sources))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python list_importers.py <output.idx> <format:path> [<format:path> ...]")
+        print(f"Formats: {', '.join(IMPORTERS)}")
+        sys.exit(1)
+    started = time.perf_counter()
+    sources = parse_sources(",".join(sys.argv[2:]))
+    count = build_index(iter_sources(sources), sys.argv[1], sources)
+    print(f"Wrote {count} entities to {sys.argv[1]} in {time.perf_counter() - started:.2f}s")
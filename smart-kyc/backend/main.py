@@ -3,12 +3,18 @@ Smart KYC Screener - FastAPI Backend
 Handles KYC screening with Pathway engine, Landing AI DPT-2, and live rule editing
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-import yaml
 import json
+import math
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -21,8 +27,94 @@ from landingai_client import LandingAIClient
 from adverse_media import AdverseMediaScanner
 from explain import ExplainService
 from kyc_service import KYCService
+from report_stream import stream_ndjson, stream_zip
+from export import export_results, EXPORT_FORMATS
+from history_store import HistoryStore
+from audit_log import AuditLog
+from metrics_stream import MetricsBroadcaster
+from admission import AdmissionController, AdmissionRejected, Lane
+from executor import ScreeningExecutor, LoopLagMonitor
+from response_format import format_results, json_response
+
+# Sanctions/rules are loaded by a background warm-up task, not at import time
+warmup = {"task": None, "error": None, "ready_seconds": None, "failures": 0, "retry_at": None}
+# A failed warm-up is retried after 1s, 2s, 4s, ... up to the max
+WARMUP_RETRY_SECONDS = float(os.getenv("KYC_WARMUP_RETRY_SECONDS", 1.0))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("KYC_WARMUP_RETRY_MAX_SECONDS", 60.0))
+
+def warm_up_retry_in() -> float:
+    """Seconds until a failed warm-up may be retried (0 if it may run now)"""
+    if warmup["retry_at"] is None:
+        return 0.0
+    return max(0.0, warmup["retry_at"] - time.monotonic())
+
+def start_warm_up() -> Optional[asyncio.Task]:
+    """
+    Start loading the engine in a worker thread (idempotent). After a failure a new
+    attempt starts only once the backoff has passed; returns None while waiting.
+    """
+    if warmup["task"] is None and not pathway_engine.ready and warm_up_retry_in() == 0:
+        async def run():
+            try:
+                await asyncio.to_thread(pathway_engine.warm_up)
+                warmup["ready_seconds"] = time.perf_counter() - IMPORT_STARTED
+                warmup.update(error=None, failures=0, retry_at=None)
+                print(f"Engine ready in {warmup['ready_seconds']:.3f}s (import {IMPORT_SECONDS:.3f}s)")
+            except Exception as e:
+                warmup["failures"] += 1
+                delay = min(WARMUP_RETRY_SECONDS * 2 ** (warmup["failures"] - 1), WARMUP_RETRY_MAX_SECONDS)
+                warmup.update(error=str(e), retry_at=time.monotonic() + delay)
+                print(f"Warning: Engine warm-up failed, retrying in {delay:g}s: {e}")
+            finally:
+                warmup["task"] = None
+        warmup["task"] = asyncio.create_task(run())
+    return warmup["task"]
 
-app = FastAPI(title="Smart KYC Screener API")
+async def ensure_ready():
+    """Wait for warm-up before running anything that needs the engine (503 while it is failing)"""
+    if pathway_engine.ready:
+        return
+    task = start_warm_up()
+    if task is not None:
+        await asyncio.shield(task)
+    if not pathway_engine.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Engine warm-up failed: {warmup['error']}",
+            headers={"Retry-After": str(max(1, math.ceil(warm_up_retry_in())))}
+        )
+
+def open_audit_log() -> Optional[AuditLog]:
+    """Append-only decision audit log (set AUDIT_LOG_DIR to an empty string to disable)"""
+    directory = os.getenv("AUDIT_LOG_DIR", "./audit")
+    if not directory:
+        return None
+    return AuditLog(
+        directory,
+        batch_size=int(os.getenv("AUDIT_BATCH_SIZE", 1000)),
+        flush_interval=float(os.getenv("AUDIT_FLUSH_MS", 50)) / 1000,
+        segment_bytes=int(os.getenv("AUDIT_SEGMENT_MB", 64)) * 1024 * 1024,
+        queue_size=int(os.getenv("AUDIT_QUEUE_SIZE", 10000)),
+        durable=os.getenv("AUDIT_DURABLE", "1") != "0"
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Started here, not at import: the writer thread also compresses leftover segments
+    pathway_engine.audit_log = open_audit_log()
+    start_warm_up()
+    loop_lag.start()
+    yield
+    loop_lag.stop()
+    executor.shutdown()
+    if history_store is not None:
+        await asyncio.to_thread(history_store.close)
+    if pathway_engine.audit_log is not None:
+        # Outside the loop: waits for the last group commit
+        await asyncio.to_thread(pathway_engine.audit_log.close)
+        pathway_engine.audit_log = None
+
+app = FastAPI(title="Smart KYC Screener API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -34,11 +126,51 @@ app.add_middleware(
 )
 
 # Initialize services
-pathway_engine = PathwayEngine()
+pathway_engine = PathwayEngine(lazy=True)  # the audit log is attached in lifespan
 landing_ai = LandingAIClient()
 adverse_media = AdverseMediaScanner()
 explain_service = ExplainService()
-kyc_service = KYCService(pathway_engine, landing_ai, adverse_media, explain_service)
+# Screening history (set SQLITE_PATH to an empty string to disable)
+history_path = os.getenv("SQLITE_PATH", "./evidence.db")
+history_store = HistoryStore(history_path) if history_path else None
+
+# Admission control: bounded queues per endpoint class, interactive work ahead of batch rows
+admission = AdmissionController(
+    lanes={
+        "interactive": Lane(
+            "interactive",
+            int(os.getenv("KYC_INTERACTIVE_CONCURRENCY", 32)),
+            int(os.getenv("KYC_INTERACTIVE_QUEUE", 128))
+        ),
+        "batch": Lane(
+            "batch",
+            int(os.getenv("KYC_BATCH_CONCURRENCY", 2)),
+            int(os.getenv("KYC_BATCH_QUEUE", 4))
+        )
+    },
+    worker_slots=int(os.getenv("KYC_WORKER_SLOTS", os.cpu_count() or 4))
+)
+
+# CPU-bound screening work runs on a dedicated executor ("thread" or "process")
+executor = ScreeningExecutor(
+    pathway_engine,
+    os.getenv("KYC_EXECUTOR", "thread"),
+    int(os.getenv("KYC_EXECUTOR_WORKERS", 0)) or None
+)
+loop_lag = LoopLagMonitor()
+
+kyc_service = KYCService(pathway_engine, landing_ai, adverse_media, explain_service, history_store, admission, executor)
+
+metrics_broadcaster = MetricsBroadcaster(pathway_engine, float(os.getenv("METRICS_TICK_SECONDS", 1.0)))
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc: AdmissionRejected):
+    """Fast 429 when a lane is saturated"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "lane": exc.lane, "queued": exc.queued},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # Pydantic models
 class ScreenRequest(BaseModel):
@@ -48,6 +180,11 @@ class ScreenRequest(BaseModel):
     email: Optional[str] = None
     document_type: Optional[str] = None
 
+class MatchCandidatesRequest(BaseModel):
+    name: str
+    k: int = 5
+    threshold: Optional[int] = None
+
 class TeachRuleRequest(BaseModel):
     rule_id: str
     description: str
@@ -60,6 +197,18 @@ class UpdateThresholdRequest(BaseModel):
     threshold_name: str
     value: Any
 
+class SanctionsDeltaRequest(BaseModel):
+    entities: List[Dict[str, Any]]  # added or changed entries: {id, name, aliases, country, source, list_type}
+    removed: List[Dict[str, Any]] = []  # removed entries and the previous versions of changed ones
+    rule_set: Optional[str] = None
+
+class BulkReportRequest(BaseModel):
+    cases: Optional[List[Dict[str, Any]]] = None
+    job_id: Optional[str] = None
+    report_type: str = "auto"  # "edd", "sar", or "auto" (SAR for BLOCK, EDD otherwise)
+    format: str = "zip"  # "zip" or "ndjson"
+    include_approved: bool = False
+
 @app.get("/")
 async def root():
     return {
@@ -72,19 +221,84 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...)):
-    """Upload CSV file with applicants for batch screening"""
-    try:
-        results = await kyc_service.process_csv(file)
-        return {
-            "success": True,
-            "total": len(results),
-            "results": results,
-            "metrics": kyc_service.get_metrics()
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 only once sanctions and rules are loaded"""
+    body = {
+        "ready": pathway_engine.ready,
+        "import_seconds": round(IMPORT_SECONDS, 4),
+        "warmup_seconds": round(pathway_engine.warmup_seconds, 4) if pathway_engine.warmup_seconds is not None else None,
+        "ready_seconds": round(warmup["ready_seconds"], 4) if warmup["ready_seconds"] is not None else None,
+        "error": warmup["error"],
+        "failures": warmup["failures"],
+        "sanctions_entities": len(pathway_engine.sanctions) if pathway_engine.sanctions is not None else None
+    }
+    if not pathway_engine.ready:
+        # Retries a failed warm-up once its backoff has passed
+        start_warm_up()
+        body["retry_in_seconds"] = round(warm_up_retry_in(), 1) if warmup["error"] else None
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+def export_response(results: List[Dict[str, Any]], fmt: str, job_id: str) -> Response:
+    """Serialize batch results as a downloadable columnar file"""
+    payload, used_format = export_results(results, fmt)
+    media_type, extension = EXPORT_FORMATS[used_format]
+    return Response(
+        content=payload,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=kyc-results-{job_id}.{extension}",
+            "X-Job-Id": job_id
         }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    )
+
+@app.post("/upload-csv")
+async def upload_csv(
+    file: UploadFile = File(...),
+    export: Optional[str] = None,
+    fields: Optional[str] = None,
+    compact: bool = False,
+    rule_set: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Upload CSV file with applicants for batch screening (set export=parquet|arrow|csv for a flat table).
+    fields= projects each result (comma-separated, dotted for nested keys); compact=true returns rule ids
+    instead of rule objects and drops the explanation. rule_set= screens with a named rule set.
+    """
+    if export is not None and export not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{export}'")
+    await ensure_ready()
+    async with admission.admit("batch"):
+        try:
+            results, summary = await kyc_service.process_csv(file, rule_set)
+            job_id = await kyc_service.register_job(results)
+            if export is not None:
+                # Parquet/Arrow encoding is CPU work; keep it off the loop
+                return await executor.run(export_response, results, export, job_id)
+            body = {
+                "success": True,
+                "job_id": job_id,
+                "total": len(results),
+                "summary": summary,
+                "results": format_results(results, fields, compact),
+                "metrics": kyc_service.get_metrics()
+            }
+            # Encoding a large batch is CPU work too; keep it off the loop
+            return await executor.run(json_response, body, accept_encoding)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/export/{job_id}")
+async def export_job(job_id: str, format: str = "parquet"):
+    """Export results of a previous /upload-csv job as Parquet, Arrow IPC or CSV"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{format}'")
+    results = await kyc_service.get_job(job_id)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return await executor.run(export_response, results, format, job_id)
 
 @app.post("/upload-id")
 async def upload_id(file: UploadFile = File(...)):
@@ -101,32 +315,155 @@ async def upload_id(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/screen")
-async def screen_applicant(request: ScreenRequest):
-    """Screen a single applicant"""
-    try:
-        result = await kyc_service.screen_applicant(request.dict())
-        return {
-            "success": True,
-            "result": result
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+async def screen_applicant(
+    request: ScreenRequest,
+    fields: Optional[str] = None,
+    compact: bool = False,
+    rule_set: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Screen a single applicant (supports the same fields= / compact= / rule_set= options as /upload-csv)"""
+    await ensure_ready()
+    async with admission.admit("interactive"):
+        try:
+            result = await kyc_service.screen_applicant(request.dict(), rule_set=rule_set)
+            await kyc_service.record_history([result])
+            return json_response({
+                "success": True,
+                "result": format_results([result], fields, compact)[0]
+            }, accept_encoding)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/match-candidates")
+async def match_candidates(request: MatchCandidatesRequest):
+    """Top-k sanctions/PEP candidates for analyst review"""
+    await ensure_ready()
+    async with admission.admit("interactive"):
+        try:
+            candidates = await executor.run(pathway_engine.fuzzy_match_top_k, request.name, request.k, request.threshold)
+            return {
+                "success": True,
+                "name": request.name,
+                "candidates": candidates
+            }
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/rescreen-delta")
+async def rescreen_delta(request: SanctionsDeltaRequest):
+    """Re-check stored customers against added/changed sanctions entries; returns only changed decisions"""
+    await ensure_ready()
+    async with admission.admit("batch"):
+        try:
+            report = await executor.run(kyc_service.rescreen_delta, request.entities, request.removed, request.rule_set)
+            return {
+                "success": True,
+                **report
+            }
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/metrics")
 async def get_metrics():
     """Get current screening metrics"""
     return kyc_service.get_metrics()
 
+@app.get("/metrics/windows")
+async def get_window_metrics(window: Optional[str] = None):
+    """Decisions over the last 1m/5m/1h by decision, rule and country (`?window=5m` or a comma-separated list)"""
+    try:
+        windows = [name.strip() for name in window.split(",") if name.strip()] if window else None
+        return kyc_service.get_window_metrics(windows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics/stream")
+async def stream_metrics():
+    """Live metrics over Server-Sent Events: a snapshot, then deltas coalesced to METRICS_TICK_SECONDS"""
+    return StreamingResponse(
+        metrics_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/history")
+async def get_history(
+    decision: Optional[str] = None,
+    rule_id: Optional[str] = None,
+    country: Optional[str] = None,
+    name: Optional[str] = None,
+    job_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50
+):
+    """Paginated screening history (newest first); pass next_cursor back as cursor for the next page"""
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Screening history is disabled")
+    page = await asyncio.to_thread(
+        history_store.query, decision, rule_id, country, name, job_id, since, until, cursor, max(1, min(limit, 500))
+    )
+    return {
+        "success": True,
+        **page
+    }
+
+@app.get("/history/{screening_id}")
+async def get_history_item(screening_id: int):
+    """Full stored result for one screening"""
+    if history_store is None:
+        raise HTTPException(status_code=404, detail="Screening history is disabled")
+    item = await asyncio.to_thread(history_store.get, screening_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"Screening {screening_id} not found")
+    return {
+        "success": True,
+        "result": item
+    }
+
+@app.get("/admission")
+async def get_admission_stats():
+    """Queue depth, in-flight and rejection counts per lane, plus work-slot usage"""
+    return admission.stats()
+
+@app.get("/runtime")
+async def get_runtime_stats():
+    """Executor usage, event-loop lag (should stay near zero while screening) and audit log writer state"""
+    return {
+        "executor": executor.stats(),
+        "loop_lag": loop_lag.stats(),
+        "audit_log": pathway_engine.audit_log.stats() if pathway_engine.audit_log is not None else None
+    }
+
 @app.get("/rules")
-async def get_rules():
-    """Get current rules configuration"""
+async def get_rules(rule_set: Optional[str] = None):
+    """Get current rules configuration (or a named rule set's)"""
+    if rule_set is not None:
+        await ensure_ready()
+        try:
+            return pathway_engine.rule_set(rule_set).rules_config
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    import yaml
     with open("rules.yaml", "r") as f:
         rules = yaml.safe_load(f)
     return rules
 
+@app.get("/rule-sets")
+async def list_rule_sets():
+    """Named rule sets available for rule_set=, plus compiled-program cache stats"""
+    return {
+        "rule_sets": pathway_engine.rule_sets.available(),
+        "cache": pathway_engine.rule_sets.stats()
+    }
+
 @app.post("/teach-rule")
 async def teach_rule(request: TeachRuleRequest):
     """Teach the system a new rule (live editing)"""
+    import yaml
+    await ensure_ready()
     try:
         # Load current rules
         with open("rules.yaml", "r") as f:
@@ -171,9 +508,54 @@ async def teach_rule(request: TeachRuleRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/backtest")
+async def backtest_rules(
+    rules: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    job_id: Optional[str] = Form(None),
+    replace: bool = Form(False),
+    limit: int = Form(100)
+):
+    """
+    Backtest candidate rules against stored enriched features (uploaded table or a previous job).
+    `rules` is a JSON list; by default they are merged into the current rules by id, or replace them with replace=true.
+    """
+    from backtest import backtest, features_from_results, load_features, merge_rules
+    
+    await ensure_ready()
+    async with admission.admit("batch"):
+        try:
+            new_rules = json.loads(rules)
+            if isinstance(new_rules, dict):
+                new_rules = [new_rules]
+        
+            if file is not None:
+                features = load_features(await file.read(), file.filename or "")
+            elif job_id is not None:
+                results = await kyc_service.get_job(job_id)
+                if results is None:
+                    raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+                features = features_from_results(results)
+            else:
+                raise HTTPException(status_code=400, detail="Provide either a feature file or 'job_id'")
+        
+            current_rules = pathway_engine.rules_config.get("rules", [])
+            candidate_rules = new_rules if replace else merge_rules(current_rules, new_rules)
+            report = await asyncio.to_thread(backtest, features, current_rules, candidate_rules, limit)
+            return {
+                "success": True,
+                **report
+            }
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/update-threshold")
 async def update_threshold(request: UpdateThresholdRequest):
     """Update a threshold value"""
+    import yaml
+    await ensure_ready()
     try:
         with open("rules.yaml", "r") as f:
             config = yaml.safe_load(f)
@@ -244,6 +626,38 @@ async def draft_sar(applicant_data: Dict[str, Any]):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/draft-reports")
+async def draft_reports(request: BulkReportRequest):
+    """Draft EDD/SAR reports for a batch of cases (or a previous /upload-csv job), streamed as zip or NDJSON"""
+    if request.report_type not in ("edd", "sar", "auto"):
+        raise HTTPException(status_code=400, detail=f"Unknown report type '{request.report_type}'")
+    if request.format not in ("zip", "ndjson"):
+        raise HTTPException(status_code=400, detail=f"Unknown format '{request.format}'")
+    
+    if request.job_id is not None:
+        cases = await kyc_service.get_job(request.job_id)
+        if cases is None:
+            raise HTTPException(status_code=404, detail=f"Job '{request.job_id}' not found")
+    elif request.cases is not None:
+        cases = request.cases
+    else:
+        raise HTTPException(status_code=400, detail="Provide either 'cases' or 'job_id'")
+    
+    # Only flagged cases need reports unless asked otherwise
+    if not request.include_approved:
+        cases = [case for case in cases if case.get("decision") != "APPROVE"]
+    
+    reports = explain_service.draft_reports(cases, request.report_type)
+    if request.format == "ndjson":
+        return StreamingResponse(stream_ndjson(reports), media_type="application/x-ndjson")
+    return StreamingResponse(
+        stream_zip(reports, executor.run),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=kyc-reports.zip"}
+    )
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,109 @@
+"""
+Live Metrics Stream
+Pushes metric deltas to subscribed dashboards (Server-Sent Events), coalesced to a fixed tick rate
+"""
+
+import asyncio
+import json
+from typing import Dict, Any, AsyncIterator, Optional
+
+
+def metrics_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keys whose values changed (by_rule and percentages diffed one level down;
+    nested keys that disappeared, e.g. after a reset, are sent as null)
+    """
+    delta = {}
+    for key, value in current.items():
+        if isinstance(value, dict):
+            old = previous.get(key) or {}
+            changed = {k: v for k, v in value.items() if old.get(k) != v}
+            changed.update({k: None for k in old if k not in value})
+            if changed:
+                delta[key] = changed
+        elif previous.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+class _Subscriber:
+    """Pending changes for one client; merged while the client is busy so memory stays bounded"""
+
+    def __init__(self):
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def push(self, delta: Dict[str, Any]):
+        for key, value in delta.items():
+            if isinstance(value, dict):
+                self.pending.setdefault(key, {}).update(value)
+            else:
+                self.pending[key] = value
+        self.event.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        delta, self.pending = self.pending, {}
+        return delta
+
+
+class MetricsBroadcaster:
+    """
+    One tick loop per process: each tick compares the engine's metrics version and,
+    only if something changed, computes a single delta and hands it to every subscriber.
+    Work per tick is independent of the number of clients polling.
+    """
+
+    def __init__(self, pathway_engine, tick_seconds: float = 1.0, heartbeat_seconds: float = 15.0):
+        self.pathway_engine = pathway_engine
+        self.tick_seconds = tick_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscribers = set()
+        self._task = None
+        self._last_version = None
+        self._last_snapshot = {}
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return self.pathway_engine.get_metrics()
+
+    async def _run(self):
+        while self.subscribers:
+            version = self.pathway_engine.metrics_version
+            if version != self._last_version:
+                snapshot = self._snapshot()
+                delta = metrics_delta(self._last_snapshot, snapshot)
+                self._last_version = version
+                self._last_snapshot = snapshot
+                if delta:
+                    for subscriber in self.subscribers:
+                        subscriber.push(delta)
+            await asyncio.sleep(self.tick_seconds)
+        self._task = None
+
+    def subscribe(self) -> _Subscriber:
+        subscriber = _Subscriber()
+        self.subscribers.add(subscriber)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def stream(self) -> AsyncIterator[str]:
+        """SSE stream: a full snapshot first, then deltas as screenings complete"""
+        subscriber = self.subscribe()
+        try:
+            yield f"event: snapshot\ndata: {json.dumps(self._snapshot())}\n\n"
+            while True:
+                delta = await subscriber.next(self.heartbeat_seconds)
+                if delta is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: delta\ndata: {json.dumps(delta)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
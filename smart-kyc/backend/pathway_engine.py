@@ -3,17 +3,59 @@ Pathway Engine for KYC Screening
 Handles fuzzy matching, rule evaluation, and real-time metrics
 """
 
-import yaml
-import pandas as pd
-from fuzzywuzzy import fuzz
+import os
+import threading
+import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+import numpy as np
+
+from sanctions_index import open_sanctions, normalize_name, candidate_key
+from rule_sets import CompiledRuleSet, RuleSetCache, DEFAULT_RULE_SET
+from records import MatchResult, EnrichedApplicant, RuleEvaluation, NO_MATCH
+from rolling_metrics import RollingMetrics
+
+
+def ratio_upper_bound(len_a: int, len_b: int) -> int:
+    """Highest fuzz.ratio two strings of these lengths can reach (at most min(len) characters can match)"""
+    if len_a == 0 or len_b == 0:
+        return 0
+    return int(round(200 * min(len_a, len_b) / (len_a + len_b)))
+
+
+def ratio_bounds(query: str, lengths: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Upper bound on fuzz.ratio(query, s) for many strings s at once, from their character lengths and
+    candidate_key histograms: at most the characters in common can match, so ratio <= 200 * shared / total.
+    """
+    shared = np.minimum(keys, np.frombuffer(candidate_key(query), dtype=np.uint8)).sum(axis=1, dtype=np.int64)
+    shared = np.where(lengths > 255, np.minimum(lengths, len(query)), shared)  # histogram counts are capped
+    total = lengths.astype(np.int64) + len(query)
+    return (200 * shared + total - 1) // np.maximum(total, 1)  # rounded up: never below the real score
+
 
 class PathwayEngine:
-    def __init__(self):
-        self.sanctions_df = None
+    def __init__(self, lazy: bool = False, audit_log=None):
+        """
+        Set lazy=True to defer loading sanctions/rules until warm_up() or first use.
+        Recorded decisions are appended to `audit_log` (an AuditLog) if given.
+        """
+        self.sanctions = None
         self.rules_config = None
+        self.rule_index = None
+        self.default_rule_set = None
+        # Named per-tenant rule sets, compiled on first use
+        self.rule_sets = RuleSetCache(
+            os.getenv("RULESETS_DIR", "rulesets"),
+            int(os.getenv("KYC_RULESET_CACHE_SIZE", 32))
+        )
+        self.ready = False
+        # Bumped on every (re)load; identifies which rules/sanctions a result was computed with
+        self.rules_version = 0
+        self.sanctions_version = 0
+        self.warmup_seconds = None
+        self._warmup_lock = threading.Lock()
         self.metrics = {
             "total_screened": 0,
             "approved": 0,
@@ -22,70 +64,172 @@ class PathwayEngine:
             "by_rule": {},
             "last_updated": None
         }
-        self.load_sanctions()
-        self.load_rules()
+        # Bumped on every change so live subscribers can skip idle ticks
+        self.metrics_version = 0
+        # Last minute / 5 minutes / hour, alongside the all-time counters
+        self.rolling_metrics = RollingMetrics(max_keys=int(os.getenv("KYC_METRICS_MAX_KEYS", 256)))
+        self.audit_log = audit_log
+        if not lazy:
+            self.warm_up()
+    
+    def warm_up(self):
+        """
+        Load sanctions, rules and the matcher (safe to call from a background thread).
+        Raises (leaving the engine not ready) if the sanctions list can't be loaded.
+        """
+        with self._warmup_lock:
+            if self.ready:
+                return
+            started = time.perf_counter()
+            self.load_rules()
+            self.load_sanctions()
+            from fuzzywuzzy import fuzz  # noqa: F401 - import the matcher ahead of the first request
+            self.warmup_seconds = time.perf_counter() - started
+            self.ready = True
     
     def load_sanctions(self):
-        """Load sanctions and PEP lists"""
-        try:
-            self.sanctions_df = pd.read_csv("data/sanctions.csv")
-        except Exception as e:
-            print(f"Warning: Could not load sanctions list: {e}")
-            self.sanctions_df = pd.DataFrame(columns=["id", "name", "aliases", "country", "source", "list_type"])
+        """
+        Load sanctions and PEP lists (memory-mapped index if one has been built).
+        SANCTIONS_SOURCES (e.g. "ofac:sdn.xml,un:consolidated.xml,eu:eu.csv") reads official list files instead of the CSV.
+        Raises if the list can't be read: screening without it would approve sanctioned names.
+        A list loaded earlier stays in use.
+        """
+        index_path = os.getenv("SANCTIONS_INDEX_PATH", "data/sanctions.idx")
+        sources = os.getenv("SANCTIONS_SOURCES")
+        if sources:
+            from list_importers import open_sources, parse_sources
+            sanctions = open_sources(parse_sources(sources), index_path)
+        else:
+            sanctions = open_sanctions(os.getenv("SANCTIONS_CSV_PATH", "data/sanctions.csv"), index_path)
+        self.sanctions = sanctions
+        self.sanctions_version += 1
     
     def load_rules(self):
         """Load rules from YAML"""
+        import yaml
         try:
             with open("rules.yaml", "r") as f:
-                self.rules_config = yaml.safe_load(f)
+                rules_config = yaml.safe_load(f)
         except Exception as e:
             print(f"Warning: Could not load rules: {e}")
-            self.rules_config = {"thresholds": {}, "rules": []}
+            rules_config = {"thresholds": {}, "rules": []}
+        
+        # Compile once per load; evaluate_rules only checks candidate rules
+        self.rules_version += 1
+        self.default_rule_set = CompiledRuleSet(DEFAULT_RULE_SET, rules_config, self.rules_version)
+        self.rule_index = self.default_rule_set.rule_index
+        self.rules_config = rules_config
     
     def reload_rules(self):
         """Reload rules (called after teach_rule)"""
         self.load_rules()
     
-    def fuzzy_match_name(self, name: str, threshold: Optional[int] = None) -> Dict[str, Any]:
+    def rule_set(self, name: Optional[str] = None) -> CompiledRuleSet:
+        """Compiled rule set by name; None or "default" is rules.yaml"""
+        if not self.ready:
+            self.warm_up()
+        if name is None or name == DEFAULT_RULE_SET:
+            return self.default_rule_set
+        return self.rule_sets.get(name)
+    
+    def _match_threshold(self) -> int:
+        return self.default_rule_set.match_threshold()
+    
+    def _top_k_candidates(self, name: str, k: int, min_score: int) -> List[tuple]:
+        """
+        Best-scoring entities as (score, entity index, matched candidate), highest first.
+        Bounds every candidate's fuzz.ratio at once from the list's precomputed lengths and
+        character histograms, then decodes and scores candidates in descending bound order,
+        stopping once no remaining bound can reach the k-th score or min_score.
+        """
+        from fuzzywuzzy import fuzz
+        
+        query = normalize_name(name)
+        floor = max(min_score, 1)  # a score of 0 is never a match
+        
+        lengths, keys, owners = self.sanctions.candidate_keys()
+        bounds = ratio_bounds(query, lengths, keys)
+        order = np.flatnonzero(bounds >= floor)
+        order = order[np.argsort(-bounds[order], kind="stable")]
+        
+        top = {}  # entity index -> (score, -candidate number, candidate), at most k entities
+        kth = floor
+        for c in order.tolist():
+            if bounds[c] < kth:
+                break
+            candidate = self.sanctions.candidate(c)
+            score = fuzz.ratio(query, candidate)
+            if score < kth:
+                continue
+            i = int(owners[c])
+            entry = (score, -c, candidate)  # an entity's earlier candidate wins ties
+            if i in top:
+                if entry[:2] <= top[i][:2]:
+                    continue
+            elif len(top) == k:
+                # Earlier entities win ties
+                worst = min(top, key=lambda j: (top[j][0], -j))
+                if (score, -i) <= (top[worst][0], -worst):
+                    continue
+                del top[worst]
+            top[i] = entry
+            if len(top) == k:
+                kth = max(floor, min(score for score, _, _ in top.values()))
+        
+        return sorted(((score, i, candidate) for i, (score, _, candidate) in top.items()), key=lambda item: (-item[0], item[1]))
+    
+    def fuzzy_match_name(self, name: str, threshold: Optional[int] = None) -> MatchResult:
         """Perform fuzzy matching against sanctions/PEP lists"""
+        if not self.ready:
+            self.warm_up()
+        
         if threshold is None:
-            threshold = self.rules_config.get("thresholds", {}).get("fuzzy_match_threshold", 85)
-        
-        best_match = {
-            "matched": False,
-            "match_score": 0,
-            "matched_entity": None,
-            "list_type": None,
-            "source": None,
-            "country": None
-        }
+            threshold = self._match_threshold()
         
-        if self.sanctions_df is None or len(self.sanctions_df) == 0:
+        best_match = NO_MATCH
+        
+        if self.sanctions is None or len(self.sanctions) == 0:
             return best_match
         
-        for _, row in self.sanctions_df.iterrows():
-            # Check main name
-            score = fuzz.ratio(name.lower(), row["name"].lower())
-            
-            # Check aliases
-            if pd.notna(row.get("aliases")):
-                aliases = str(row["aliases"]).split("|")
-                for alias in aliases:
-                    alias_score = fuzz.ratio(name.lower(), alias.lower())
-                    score = max(score, alias_score)
-            
-            if score > best_match["match_score"]:
-                best_match = {
-                    "matched": score >= threshold,
-                    "match_score": score,
-                    "matched_entity": row["name"],
-                    "list_type": row.get("list_type", "UNKNOWN"),
-                    "source": row.get("source", "UNKNOWN"),
-                    "country": row.get("country", "UNKNOWN")
-                }
+        for score, i, _ in self._top_k_candidates(name, k=1, min_score=0):
+            entity = self.sanctions.entity(i)
+            best_match = MatchResult(
+                score >= threshold,
+                score,
+                entity["name"],
+                entity["list_type"],
+                entity["source"],
+                entity["country"]
+            )
         
         return best_match
     
+    def fuzzy_match_top_k(self, name: str, k: int = 5, threshold: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ranked top-k sanctions/PEP candidates scoring at or above threshold, with the alias that matched"""
+        if not self.ready:
+            self.warm_up()
+        
+        if threshold is None:
+            threshold = self._match_threshold()
+        
+        if k <= 0 or self.sanctions is None or len(self.sanctions) == 0:
+            return []
+        
+        candidates = []
+        for rank, (score, i, alias) in enumerate(self._top_k_candidates(name, k, threshold), start=1):
+            entity = self.sanctions.entity(i)
+            candidates.append({
+                "rank": rank,
+                "match_score": score,
+                "matched_entity": entity["name"],
+                "matched_alias": alias,
+                "entity_id": entity["id"],
+                "list_type": entity["list_type"],
+                "source": entity["source"],
+                "country": entity["country"]
+            })
+        return candidates
+    
     def evaluate_condition(self, condition: Dict[str, Any], applicant_data: Dict[str, Any]) -> bool:
         """Evaluate a single condition"""
         field = condition.get("field")
@@ -114,49 +258,56 @@ class PathwayEngine:
         else:
             return False
     
-    def evaluate_rules(self, applicant_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Evaluate all rules for an applicant"""
+    def evaluate_rules(
+        self,
+        applicant_data: Dict[str, Any],
+        match_result: Optional[Dict[str, Any]] = None,
+        rule_set: Optional[str] = None,
+        record: bool = True
+    ) -> RuleEvaluation:
+        """
+        Evaluate all rules for an applicant (pass match_result if fuzzy matching already ran elsewhere).
+        `rule_set` selects a named rule set instead of rules.yaml; record=False leaves the metrics untouched.
+        Callers that record the decision then await audit_decision() with the result.
+        """
+        program = self.rule_set(rule_set)
+        
         # Perform fuzzy matching
-        match_result = self.fuzzy_match_name(applicant_data.get("name", ""))
-        
-        # Enrich applicant data with match results
-        enriched_data = {
-            **applicant_data,
-            "sanctions_match_score": match_result["match_score"],
-            "pep_match": match_result["matched"] and match_result["list_type"] == "PEP",
-            "sanctions_match": match_result["matched"] and match_result["list_type"] == "SANCTIONS",
-            "adverse_media_count": applicant_data.get("adverse_media_count", 0),
-            "match_details": match_result
-        }
+        if match_result is None:
+            match_result = self.fuzzy_match_name(applicant_data.get("name", ""), program.match_threshold())
+        else:
+            match_result = MatchResult.coerce(match_result)
         
-        # Evaluate rules in priority order
-        rules = sorted(self.rules_config.get("rules", []), key=lambda x: x.get("priority", 999))
+        # Applicant fields plus match-derived fields, without copying the applicant
+        enriched_data = EnrichedApplicant(applicant_data, match_result)
         
-        triggered_rule = None
-        for rule in rules:
-            if not rule.get("enabled", True):
-                continue
-            
-            conditions = rule.get("conditions", [])
-            
-            # Empty conditions means always trigger (default rule)
-            if len(conditions) == 0:
-                triggered_rule = rule
-                break
-            
-            # All conditions must be true
-            all_conditions_met = all(
-                self.evaluate_condition(cond, enriched_data)
-                for cond in conditions
-            )
-            
-            if all_conditions_met:
-                triggered_rule = rule
-                break
+        # First matching rule in priority order (empty conditions = default rule)
+        triggered_rule = program.rule_index.first_match(enriched_data, self.evaluate_condition)
         
         decision = triggered_rule["outcome"] if triggered_rule else "REVIEW"
         
+        evaluation = RuleEvaluation(
+            decision,
+            triggered_rule,
+            match_result,
+            enriched_data,
+            program.name,
+            program.version,
+            datetime.now().isoformat()
+        )
+        
         # Update metrics
+        if record:
+            self.record_decision(
+                decision,
+                triggered_rule["id"] if triggered_rule else "unknown",
+                applicant_data.get("country")
+            )
+        
+        return evaluation
+    
+    def record_decision(self, decision: str, rule_id: str, country: Optional[str] = None):
+        """Count one screening decision in the metrics"""
         self.metrics["total_screened"] += 1
         if decision == "APPROVE":
             self.metrics["approved"] += 1
@@ -165,17 +316,28 @@ class PathwayEngine:
         elif decision == "BLOCK":
             self.metrics["blocked"] += 1
         
-        rule_id = triggered_rule["id"] if triggered_rule else "unknown"
         self.metrics["by_rule"][rule_id] = self.metrics["by_rule"].get(rule_id, 0) + 1
         self.metrics["last_updated"] = datetime.now().isoformat()
-        
-        return {
-            "decision": decision,
-            "triggered_rule": triggered_rule,
-            "match_result": match_result,
-            "enriched_data": enriched_data,
-            "timestamp": datetime.now().isoformat()
-        }
+        self.metrics_version += 1
+        self.rolling_metrics.record(decision, rule_id, country)
+    
+    async def audit_decision(self, applicant_data: Dict[str, Any], result):
+        """
+        Queue a decision (a RuleEvaluation or ScreeningResult) for the audit log, if one is
+        configured. Waits while the audit writer is behind, without blocking the event loop.
+        """
+        if self.audit_log is None:
+            return
+        await self.audit_log.append({
+            "timestamp": result.timestamp,
+            "applicant": dict(applicant_data),
+            "decision": result.decision,
+            "triggered_rule": result.triggered_rule,
+            "rule_set": result.rule_set,
+            "rules_version": result.rules_version,
+            "sanctions_version": self.sanctions_version,
+            "match_result": result.match_result
+        })
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get current metrics"""
@@ -189,6 +351,10 @@ class PathwayEngine:
             }
         }
     
+    def get_window_metrics(self, windows: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Decision counts over the rolling windows (1m, 5m, 1h by default)"""
+        return self.rolling_metrics.snapshot(windows)
+    
     def reset_metrics(self):
         """Reset metrics (for testing)"""
         self.metrics = {
@@ -199,3 +365,5 @@ class PathwayEngine:
             "by_rule": {},
             "last_updated": None
         }
+        self.rolling_metrics.reset()
+        self.metrics_version += 1
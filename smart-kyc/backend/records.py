@@ -0,0 +1,238 @@
+"""
+Screening Records
+Slotted records for the screening pipeline. Rules and sanctions matches are shared by
+reference instead of copied into every result, and batch results are stored column-wise.
+Records are read-only mappings too, so code reading result["decision"] or .get() keeps working.
+"""
+
+from array import array
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, Optional
+
+
+class _Record(Mapping):
+    """Dict-style read access to a dataclass record's fields"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__dataclass_fields__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__dataclass_fields__)
+
+    def __len__(self) -> int:
+        return len(self.__dataclass_fields__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: to_plain(getattr(self, key)) for key in self.__dataclass_fields__}
+
+    def __reduce__(self):
+        # Frozen + slotted: rebuild through __init__ (e.g. results from process workers)
+        return (self.__class__, tuple(getattr(self, key) for key in self.__dataclass_fields__))
+
+
+def to_plain(value: Any) -> Any:
+    """Records (and batches of them) as plain dicts/lists, e.g. for json.dumps"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, ResultBatch):
+        return [item.to_dict() for item in value]
+    return value
+
+
+@dataclass(frozen=True, eq=False)
+class MatchResult(_Record):
+    __slots__ = ("matched", "match_score", "matched_entity", "list_type", "source", "country")
+
+    matched: bool
+    match_score: int
+    matched_entity: Optional[str]
+    list_type: Optional[str]
+    source: Optional[str]
+    country: Optional[str]
+
+    @classmethod
+    def coerce(cls, match: Mapping) -> "MatchResult":
+        """Accept match results produced elsewhere as plain dicts"""
+        if isinstance(match, cls):
+            return match
+        return cls(
+            bool(match.get("matched", False)),
+            match.get("match_score", 0),
+            match.get("matched_entity"),
+            match.get("list_type"),
+            match.get("source"),
+            match.get("country")
+        )
+
+
+# Shared by every applicant screened against an empty list
+NO_MATCH = MatchResult(False, 0, None, None, None, None)
+
+
+@dataclass(frozen=True, eq=False)
+class Applicant(_Record):
+    __slots__ = ("name", "email", "country", "dob")
+
+    name: Any
+    email: Any
+    country: Any
+    dob: Any
+
+    @classmethod
+    def from_data(cls, applicant_data: Mapping) -> "Applicant":
+        return cls(
+            applicant_data.get("name"),
+            applicant_data.get("email"),
+            applicant_data.get("country"),
+            applicant_data.get("dob")
+        )
+
+
+class EnrichedApplicant(Mapping):
+    """
+    What rules see: the applicant's fields plus match-derived fields, computed on
+    access instead of copying the applicant into a new dict
+    """
+
+    __slots__ = ("applicant", "match_result")
+
+    DERIVED = ("sanctions_match_score", "pep_match", "sanctions_match", "adverse_media_count", "match_details")
+
+    def __init__(self, applicant: Mapping, match_result: MatchResult):
+        self.applicant = applicant
+        self.match_result = match_result
+
+    def __getitem__(self, key: str) -> Any:
+        match = self.match_result
+        if key == "sanctions_match_score":
+            return match.match_score
+        if key == "pep_match":
+            return match.matched and match.list_type == "PEP"
+        if key == "sanctions_match":
+            return match.matched and match.list_type == "SANCTIONS"
+        if key == "adverse_media_count":
+            return self.applicant.get("adverse_media_count", 0)
+        if key == "match_details":
+            return match
+        return self.applicant[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.DERIVED or key in self.applicant
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.applicant:
+            if key not in self.DERIVED:
+                yield key
+        yield from self.DERIVED
+
+    def __len__(self) -> int:
+        return sum(1 for key in self.applicant if key not in self.DERIVED) + len(self.DERIVED)
+
+
+@dataclass(frozen=True, eq=False)
+class RuleEvaluation(_Record):
+    """evaluate_rules output; triggered_rule is the rule set's own rule dict"""
+    __slots__ = ("decision", "triggered_rule", "match_result", "enriched_data", "rule_set", "rules_version", "timestamp")
+
+    decision: str
+    triggered_rule: Optional[Dict[str, Any]]
+    match_result: MatchResult
+    enriched_data: EnrichedApplicant
+    rule_set: str
+    rules_version: int
+    timestamp: str
+
+
+@dataclass(frozen=True, eq=False)
+class ScreeningResult(_Record):
+    __slots__ = (
+        "applicant", "decision", "triggered_rule", "match_result", "adverse_media_count",
+        "explanation", "rule_set", "rules_version", "timestamp"
+    )
+
+    applicant: Applicant
+    decision: str
+    triggered_rule: Optional[Dict[str, Any]]
+    match_result: MatchResult
+    adverse_media_count: int
+    explanation: Dict[str, Any]
+    rule_set: str
+    rules_version: int
+    timestamp: str
+
+    @property
+    def rule_id(self) -> str:
+        return self.triggered_rule["id"] if self.triggered_rule else "unknown"
+
+    def with_applicant(self, applicant: Applicant) -> "ScreeningResult":
+        """Same outcome for another applicant (duplicates and joined screenings)"""
+        return ScreeningResult(
+            applicant, self.decision, self.triggered_rule, self.match_result,
+            self.adverse_media_count, self.explanation, self.rule_set, self.rules_version, self.timestamp
+        )
+
+
+class ResultBatch(Sequence):
+    """
+    Batch results column-wise: the applicant fields of each row plus an index into
+    the distinct screening outcomes, so duplicate rows cost a few list slots instead
+    of a result per row. Rows are materialized as ScreeningResult on access.
+    """
+
+    __slots__ = ("_outcomes", "_outcome_index", "_rows", "_names", "_emails", "_countries", "_dobs")
+
+    def __init__(self):
+        self._outcomes = []
+        self._outcome_index = {}  # id(outcome) -> position in _outcomes
+        self._rows = array("I")
+        self._names = []
+        self._emails = []
+        self._countries = []
+        self._dobs = []
+
+    def append(self, result: ScreeningResult, applicant: Optional[Applicant] = None):
+        """Add a row; pass `applicant` when the row reuses another row's outcome"""
+        position = self._outcome_index.get(id(result))
+        if position is None:
+            position = len(self._outcomes)
+            self._outcome_index[id(result)] = position
+            self._outcomes.append(result)
+        if applicant is None:
+            applicant = result.applicant
+        self._rows.append(position)
+        self._names.append(applicant.name)
+        self._emails.append(applicant.email)
+        self._countries.append(applicant.country)
+        self._dobs.append(applicant.dob)
+
+    def _row(self, i: int) -> ScreeningResult:
+        outcome = self._outcomes[self._rows[i]]
+        applicant = outcome.applicant
+        name, email, country, dob = self._names[i], self._emails[i], self._countries[i], self._dobs[i]
+        if applicant.name is name and applicant.email is email and applicant.country is country and applicant.dob is dob:
+            return outcome
+        return outcome.with_applicant(Applicant(name, email, country, dob))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._row(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("result index out of range")
+        return self._row(i)
+
+    def __iter__(self) -> Iterator[ScreeningResult]:
+        for i in range(len(self._rows)):
+            yield self._row(i)
@@ -0,0 +1,79 @@
+"""
+Report Streaming
+Encodes bulk EDD/SAR reports as a zip archive or NDJSON while they are being rendered
+"""
+
+import json
+import re
+import zipfile
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Optional
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that zipfile writes into and the stream drains"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def tell(self) -> int:
+        # Forces zipfile into streaming mode (data descriptors, no seeking back)
+        raise OSError("stream is not seekable")
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _report_filename(report: Dict[str, Any]) -> str:
+    """Build a stable, filesystem-safe archive entry name for a report"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(report.get("name", "unknown"))).strip("_") or "unknown"
+    return f"{report['index']:05d}_{report['report_type']}_{slug}.md"
+
+
+async def stream_ndjson(reports: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Emit one JSON object per line as each report is ready"""
+    async for report in reports:
+        yield (json.dumps(report, default=str) + "\n").encode("utf-8")
+
+
+async def _call(fn: Callable, *args) -> Any:
+    return fn(*args)
+
+
+async def stream_zip(
+    reports: AsyncIterator[Dict[str, Any]],
+    run: Optional[Callable[..., Awaitable[Any]]] = None,
+    batch_size: int = 32
+) -> AsyncIterator[bytes]:
+    """
+    Emit a zip archive incrementally, one Markdown file per report. Reports are compressed
+    `batch_size` at a time through `run(fn, *args)` (e.g. ScreeningExecutor.run, to deflate off
+    the event loop); without it they are compressed inline.
+    """
+    run = run or _call
+    buffer = _ChunkBuffer()
+
+    def add(archive: zipfile.ZipFile, batch: List[Dict[str, Any]]) -> bytes:
+        for report in batch:
+            archive.writestr(_report_filename(report), report["report"])
+        return buffer.drain()
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        batch = []
+        async for report in reports:
+            batch.append(report)
+            if len(batch) >= batch_size:
+                yield await run(add, archive, batch)
+                batch = []
+        if batch:
+            yield await run(add, archive, batch)
+    # Central directory is written on close
+    yield buffer.drain()
@@ -0,0 +1,275 @@
+"""
+Delta Re-screening
+When sanctions entries are added or changed, matches only those entries against an
+index of stored customer names (the reverse of fuzzy_match_name) and reports the
+customers whose decision changes. Work grows with the delta, not customers x list size.
+"""
+
+import time
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+from pathway_engine import ratio_upper_bound, ratio_bounds
+from sanctions_index import normalize_name, candidate_key, KEY_SIZE
+from records import MatchResult
+from rule_sets import DEFAULT_RULE_SET
+
+
+def _grams(text: str) -> Set[Tuple[str, int]]:
+    """Bigrams numbered by occurrence, so set intersection counts repeated bigrams correctly"""
+    seen = {}
+    grams = set()
+    for i in range(len(text) - 1):
+        gram = text[i:i + 2]
+        seen[gram] = seen.get(gram, 0) + 1
+        grams.add((gram, seen[gram]))
+    return grams
+
+
+def _min_shared_grams(len_a: int, len_b: int, threshold: int) -> int:
+    """
+    Bigrams two strings must share to reach fuzz.ratio >= threshold. A ratio of r allows at
+    most (len_a + len_b) * (1 - r) insert/delete edits, and each edit destroys at most two bigrams.
+    """
+    max_edits = (len_a + len_b) * (201 - 2 * threshold) // 200  # ratio is rounded, so allow r >= threshold - 0.5
+    return max(len_a, len_b) - 1 - 2 * max_edits
+
+
+def diff_entities(
+    previous: Iterable[Dict[str, Any]],
+    current: Iterable[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Compare two versions of a list by entity id.
+    Returns (added or changed entities, removed entities plus the old versions of changed ones).
+    """
+    old = {entity["id"]: entity for entity in previous}
+    upserted, removed = [], []
+    for entity in current:
+        before = old.pop(entity["id"], None)
+        if before != entity:
+            upserted.append(entity)
+            if before is not None:
+                removed.append(before)
+    removed.extend(old.values())
+    return upserted, removed
+
+
+class CustomerIndex:
+    """
+    Latest screening per customer (normalized name, country, dob) and rule set, with a
+    bigram inverted index and character histograms over names. Built incrementally from
+    the history store.
+    """
+
+    def __init__(self):
+        self.customers = []    # slot -> latest screening summary
+        self._slots = {}       # customer key -> slot
+        self._postings = {}    # name length -> {(bigram, occurrence): set of slots}
+        self._keys = []        # slot -> candidate_key of the name
+        self._by_length = {}   # name length -> [slots]
+        self._arrays = None    # (keys, {length: slots}) as arrays, rebuilt after adds
+        self._by_match = {}    # currently matched entity name -> set of slots
+        self.rule_sets = set() # rule sets the screenings ran under (None: not recorded)
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return len(self.customers)
+
+    def add(self, screening: Dict[str, Any]):
+        name = screening["name_norm"]
+        # A customer screened under two rule sets has a decision under each
+        key = (name, screening.get("country"), screening.get("dob"), screening.get("rule_set"))
+        self.rule_sets.add(screening.get("rule_set"))
+        slot = self._slots.get(key)
+        if slot is not None:
+            # Same name, so the postings stay valid; keep the newest decision
+            self._by_match.get(self.customers[slot].get("matched_entity"), set()).discard(slot)
+            self.customers[slot] = screening
+        else:
+            slot = len(self.customers)
+            self._slots[key] = slot
+            self.customers.append(screening)
+            postings = self._postings.setdefault(len(name), {})
+            for gram in _grams(name) or {None}:  # one-letter names have no bigrams
+                postings.setdefault(gram, set()).add(slot)
+            self._keys.append(candidate_key(name))
+            self._by_length.setdefault(len(name), []).append(slot)
+            self._arrays = None
+        if screening.get("matched_entity"):
+            self._by_match.setdefault(screening["matched_entity"], set()).add(slot)
+
+    def matched_to(self, entity_names: Iterable[str]) -> Set[int]:
+        """Slots whose latest screening matched one of these entity names"""
+        return set().union(*(self._by_match.get(name, ()) for name in entity_names))
+
+    def refresh(self, history_store):
+        """Index screenings recorded since the last refresh"""
+        for screening in history_store.iter_screenings(self.last_id):
+            self.add(screening)
+            self.last_id = screening["id"]
+
+    def _key_arrays(self) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
+        if self._arrays is None:
+            self._arrays = (
+                np.frombuffer(b"".join(self._keys), dtype=np.uint8).reshape(-1, KEY_SIZE),
+                {length: np.array(slots, dtype=np.int64) for length, slots in self._by_length.items()}
+            )
+        return self._arrays
+
+    def candidates(self, query: str, threshold: int) -> Set[int]:
+        """
+        Slots whose names can reach fuzz.ratio >= threshold with query (a superset; callers verify).
+        Only name lengths within the ratio's length bound are searched. Within a length, names must
+        share enough bigrams with the query (counted from the postings) where that count can prune,
+        and their character histograms must allow the ratio (which still prunes at low thresholds).
+        """
+        query_grams = _grams(query)
+        keys, by_length = self._key_arrays()
+        candidates = set()
+        for length, postings in self._postings.items():
+            if ratio_upper_bound(len(query), length) < threshold:
+                continue
+            required = _min_shared_grams(len(query), length, threshold)
+            if required > 0:
+                counts = Counter()
+                for gram in query_grams:
+                    counts.update(postings.get(gram, ()))
+                slots = np.array([slot for slot, shared in counts.items() if shared >= required], dtype=np.int64)
+            else:
+                slots = by_length[length]  # short names or a low threshold: the count cannot prune
+            bounds = ratio_bounds(query, np.full(len(slots), length), keys[slots])
+            candidates.update(slots[bounds >= threshold].tolist())
+        return candidates
+
+
+def _score_floor(program) -> int:
+    """Lowest score that can affect a decision: the match threshold or any lower score rule"""
+    floor = program.match_threshold()
+    for rule in program.rules_config.get("rules", []):
+        for condition in rule.get("conditions", []):
+            if condition.get("field") == "sanctions_match_score" and condition.get("op") in ("gte", "gt"):
+                try:
+                    floor = min(floor, int(condition["value"]))
+                except (TypeError, ValueError):
+                    continue
+    return max(floor, 1)
+
+
+def _best_delta_matches(
+    index: CustomerIndex,
+    entities: List[Dict[str, Any]],
+    floor: int
+) -> Tuple[Dict[int, Tuple[int, Dict[str, Any]]], int]:
+    """Best (score, entity) per customer slot among the delta entities, and the number of comparisons made"""
+    from fuzzywuzzy import fuzz
+
+    best = {}
+    compared = 0
+    for entity in entities:
+        names = [entity["name"], *entity.get("aliases", [])]
+        for candidate in {normalize_name(name) for name in names if name}:
+            for slot in index.candidates(candidate, floor):
+                compared += 1
+                score = fuzz.ratio(candidate, index.customers[slot]["name_norm"])
+                if score >= floor and score > best.get(slot, (0, None))[0]:
+                    best[slot] = (score, entity)
+    return best, compared
+
+
+def rescreen_delta(
+    pathway_engine,
+    index: CustomerIndex,
+    entities: List[Dict[str, Any]],
+    removed: Optional[List[Dict[str, Any]]] = None,
+    rule_set: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Re-screen indexed customers against added/changed entities and report decision changes.
+    Each customer is re-evaluated under the rule set it was screened with; pass `rule_set` to
+    only re-screen that rule set's customers. Screenings stored before the rule set was
+    recorded count as `rule_set` (or the default).
+    Customers currently matched to a removed (or replaced) entity are fully re-matched against
+    the engine's loaded list, so load the new list before calling with removals.
+    """
+    started = time.perf_counter()
+    requested = rule_set or DEFAULT_RULE_SET
+    programs = {requested: pathway_engine.rule_set(requested)}
+    if rule_set is None:
+        for name in index.rule_sets - {None, requested}:
+            try:
+                programs[name] = pathway_engine.rule_set(name)
+            except ValueError as e:
+                # Deleted since those customers were screened; they can't be re-evaluated
+                print(f"Warning: Skipping customers screened under a missing rule set: {e}")
+
+    floor = min(_score_floor(program) for program in programs.values())
+    best, compared = _best_delta_matches(index, entities, floor)
+
+    stale = index.matched_to(entity["name"] for entity in removed or [])
+
+    changes = []
+    skipped = 0
+    for slot in sorted(set(best) | stale):
+        customer = index.customers[slot]
+        customer_rule_set = customer.get("rule_set") or requested
+        program = programs.get(customer_rule_set)
+        if program is None:
+            # Another rule set than the requested one, or one that no longer exists
+            skipped += rule_set is None
+            continue
+        threshold = program.match_threshold()
+        if slot in stale:
+            match_result = pathway_engine.fuzzy_match_name(customer["name"], threshold)
+            if slot in best and best[slot][0] > match_result.match_score:
+                match_result = None
+        else:
+            match_result = None
+            if best[slot][0] <= (customer.get("match_score") or 0):
+                continue  # the stored match is at least as strong
+        if match_result is None:
+            score, entity = best[slot]
+            match_result = MatchResult(
+                score >= threshold,
+                score,
+                entity["name"],
+                entity.get("list_type", "UNKNOWN"),
+                entity.get("source", "UNKNOWN"),
+                entity.get("country", "UNKNOWN")
+            )
+
+        applicant_data = {
+            "name": customer["name"],
+            "email": customer.get("email"),
+            "country": customer.get("country"),
+            "dob": customer.get("dob"),
+            "adverse_media_count": customer.get("adverse_media_count") or 0
+        }
+        result = pathway_engine.evaluate_rules(applicant_data, match_result, customer_rule_set, record=False)
+        if result.decision == customer["decision"]:
+            continue
+        changes.append({
+            "screening_id": customer["id"],
+            "applicant": {field: applicant_data[field] for field in ("name", "email", "country", "dob")},
+            "rule_set": result.rule_set,
+            "previous_decision": customer["decision"],
+            "decision": result.decision,
+            "previous_rule_id": customer.get("rule_id"),
+            "rule_id": result.triggered_rule["id"] if result.triggered_rule else "unknown",
+            "match_result": match_result.to_dict()
+        })
+
+    return {
+        "customers_indexed": len(index),
+        "rule_sets": sorted(programs),
+        "delta_entities": len(entities),
+        "removed_entities": len(removed or []),
+        "comparisons": compared,
+        "rematched": len(stale),
+        "skipped": skipped,
+        "changed": len(changes),
+        "changes": changes,
+        "elapsed_seconds": round(time.perf_counter() - started, 4)
+    }
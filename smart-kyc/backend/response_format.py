@@ -0,0 +1,127 @@
+"""
+Response Formatting
+Field projection, compact results and fast JSON (+ optional gzip) encoding for
+screening responses, so integrators only pay for the fields they use
+"""
+
+import gzip
+import json
+import math
+from collections.abc import Mapping
+from typing import Dict, List, Any, Optional, Sequence
+
+from fastapi.responses import Response
+
+from records import ResultBatch, to_plain
+
+
+def _load_orjson():
+    """orjson is optional; the standard library encoder is used without it"""
+    try:
+        import orjson
+        return orjson
+    except ImportError:
+        return None
+
+
+orjson = _load_orjson()
+
+# Responses smaller than this are sent uncompressed even if the client accepts gzip
+GZIP_MIN_BYTES = 1024
+
+
+def compact_result(result: Mapping[str, Any]) -> Dict[str, Any]:
+    """Flat result with the rule id instead of the embedded rule object and no explanation"""
+    rule = result.get("triggered_rule") or {}
+    match = result.get("match_result") or {}
+    return {
+        "applicant": result.get("applicant"),
+        "decision": result.get("decision"),
+        "rule_id": rule.get("id", "unknown"),
+        "matched": bool(match.get("matched", False)),
+        "match_score": match.get("match_score", 0),
+        "matched_entity": match.get("matched_entity"),
+        "list_type": match.get("list_type"),
+        "adverse_media_count": result.get("adverse_media_count", 0),
+        "timestamp": result.get("timestamp")
+    }
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[List[str]]]:
+    """Comma-separated field list (dotted paths select nested keys, e.g. match_result.match_score)"""
+    if not fields:
+        return None
+    return [field.strip().split(".") for field in fields.split(",") if field.strip()]
+
+
+def project(result: Mapping[str, Any], paths: List[List[str]]) -> Dict[str, Any]:
+    """Copy only the selected paths of a result; unknown paths are left out"""
+    projected = {}
+    for path in paths:
+        value, found = result, True
+        for key in path:
+            if not isinstance(value, Mapping) or key not in value:
+                found = False
+                break
+            value = value[key]
+        if not found:
+            continue
+        target = projected
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+    return projected
+
+
+def format_results(
+    results: Sequence[Mapping[str, Any]],
+    fields: Optional[str] = None,
+    compact: bool = False
+) -> Sequence[Mapping[str, Any]]:
+    """Apply compact mode, then the field projection, to each result"""
+    paths = parse_fields(fields)
+    if not compact and paths is None:
+        return results
+    formatted = []
+    for result in results:
+        if compact:
+            result = compact_result(result)
+        formatted.append(result if paths is None else project(result, paths))
+    return formatted
+
+
+def _finite(value: Any) -> Any:
+    """NaN/Infinity as None (what orjson writes), so the stdlib encoder emits valid JSON"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Mapping):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, ResultBatch)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def _default(value: Any) -> Any:
+    # Screening records/batches, numpy scalars from pandas rows, datetimes, etc.
+    plain = to_plain(value)
+    if plain is not value:
+        return _finite(plain)
+    if hasattr(value, "item"):
+        return _finite(value.item())
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(content), default=_default, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def json_response(content: Any, accept_encoding: Optional[str] = None, status_code: int = 200) -> Response:
+    """JSON response, gzip-compressed when the client accepts it and the body is large enough"""
+    body = dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    if accept_encoding and "gzip" in accept_encoding.lower() and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,131 @@
+"""
+Rolling Metrics
+Decision counts over the last minute, 5 minutes and hour, by decision, rule id and
+country. Each window is a fixed ring of time buckets plus running totals, so recording
+is O(1), queries never scan history, and memory does not grow with traffic.
+"""
+
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+
+# Window name -> span in seconds
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+TOTAL = ("total",)
+
+
+class RollingWindow:
+    """
+    Counts per key over the last `span` seconds, in `slots` buckets of span/slots seconds.
+    The oldest bucket is dropped whole, so the window covers between span - span/slots and span.
+    """
+
+    def __init__(self, span: float, slots: int = 60):
+        self.span = span
+        self.resolution = span / slots
+        self._slots = [{} for _ in range(slots)]
+        self._tick = None
+        self.totals = {}
+
+    def _advance(self, now: float):
+        """Empty the buckets that fell out of the window, subtracting them from the totals"""
+        tick = int(now // self.resolution)
+        if self._tick is None:
+            self._tick = tick
+            return
+        steps = min(tick - self._tick, len(self._slots))
+        for step in range(1, steps + 1):
+            bucket = self._slots[(self._tick + step) % len(self._slots)]
+            for key, count in bucket.items():
+                remaining = self.totals[key] - count
+                if remaining:
+                    self.totals[key] = remaining
+                else:
+                    del self.totals[key]
+            bucket.clear()
+        self._tick = max(self._tick, tick)
+
+    def add(self, keys: Iterable[tuple], now: float):
+        self._advance(now)
+        bucket = self._slots[self._tick % len(self._slots)]
+        for key in keys:
+            bucket[key] = bucket.get(key, 0) + 1
+            self.totals[key] = self.totals.get(key, 0) + 1
+
+    def counts(self, now: float) -> Dict[tuple, int]:
+        self._advance(now)
+        return dict(self.totals)
+
+
+class RollingMetrics:
+    """
+    Windowed decision metrics. Distinct rule ids and countries are capped at `max_keys`
+    each (later values are counted as "other") so arbitrary input can't grow memory.
+    """
+
+    def __init__(self, windows: Optional[Dict[str, float]] = None, slots: int = 60, max_keys: int = 256):
+        self.spans = dict(windows or WINDOWS)
+        self.slots = slots
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.windows = {name: RollingWindow(span, self.slots) for name, span in self.spans.items()}
+            self._known = {"rule": set(), "country": set()}
+            self.started = time.monotonic()
+
+    def _key(self, dimension: str, value: str) -> Tuple[str, str]:
+        known = self._known[dimension]
+        if value not in known:
+            if len(known) >= self.max_keys:
+                return (dimension, "other")
+            known.add(value)
+        return (dimension, value)
+
+    def record(self, decision: str, rule_id: str, country: Any = None):
+        """Count one screening decision in every window"""
+        if not isinstance(country, str) or not country.strip():
+            country = "UNKNOWN"  # missing, NaN from pandas, or not a name
+        now = time.monotonic()
+        with self._lock:
+            keys = (TOTAL, ("decision", decision), self._key("rule", rule_id), self._key("country", country.strip()))
+            for window in self.windows.values():
+                window.add(keys, now)
+
+    def _summary(self, window: RollingWindow, now: float) -> Dict[str, Any]:
+        counts = window.counts(now)
+        total = counts.get(TOTAL, 0)
+        breakdown = {"decision": {}, "rule": {}, "country": {}}
+        for key, count in counts.items():
+            if key[0] in breakdown:
+                breakdown[key[0]][key[1]] = count
+        decisions = breakdown["decision"]
+        # Just after start (or a reset) the window only covers the time since then
+        covered = max(min(window.span, now - self.started), window.resolution)
+        return {
+            "window_seconds": window.span,
+            "total_screened": total,
+            "per_minute": round(total / covered * 60, 2),
+            "decisions": decisions,
+            "percentages": {
+                "approved": round(decisions.get("APPROVE", 0) / total * 100, 1) if total > 0 else 0,
+                "review": round(decisions.get("REVIEW", 0) / total * 100, 1) if total > 0 else 0,
+                "blocked": round(decisions.get("BLOCK", 0) / total * 100, 1) if total > 0 else 0
+            },
+            "by_rule": breakdown["rule"],
+            "by_country": breakdown["country"]
+        }
+
+    def snapshot(self, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Summaries of the named windows (all by default); raises ValueError for unknown names"""
+        names = names or list(self.windows)
+        unknown = [name for name in names if name not in self.windows]
+        if unknown:
+            raise ValueError(f"Unknown metrics window '{unknown[0]}' (expected one of {', '.join(self.windows)})")
+        now = time.monotonic()
+        with self._lock:
+            return {name: self._summary(self.windows[name], now) for name in names}
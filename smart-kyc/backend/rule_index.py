@@ -0,0 +1,127 @@
+"""
+Rule Index
+Finds candidate rules for an applicant without scanning every rule, so large
+analyst-taught rule sets stay fast. Results match a linear scan in priority order,
+except where the scan raises TypeError (e.g. a None or NaN field compared with `gte`):
+a rule anchored on that comparison is skipped instead of failing the screening.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Any, Callable, Optional
+
+
+RANGE_OPS = ("gte", "gt", "lte", "lt")
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class RuleIndex:
+    """
+    Each enabled rule is indexed on one "anchor" condition: hash maps for
+    `equals`/`in`, sorted thresholds for `gte`/`gt`/`lte`/`lt`. A rule can only
+    match when its anchor holds, so only rules whose anchor is hit are checked.
+    Rules without an indexable condition (e.g. `contains`, or no conditions)
+    are always candidates.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        # Same order as the linear scan: stable sort by priority, disabled rules dropped
+        ordered = sorted(rules, key=lambda x: x.get("priority", 999))
+        self.rules = [rule for rule in ordered if rule.get("enabled", True)]
+
+        self.always = []   # positions that are always candidates
+        self.equals = {}   # field -> {value: [positions]}
+        self.range = {}    # (field, op) -> (sorted thresholds, positions in the same order)
+
+        pending_ranges = {}
+        for position, rule in enumerate(self.rules):
+            anchor = self._choose_anchor(rule.get("conditions", []))
+            if anchor is None:
+                self.always.append(position)
+                continue
+
+            field, op, value = anchor["field"], anchor["op"], anchor["value"]
+            if op == "equals":
+                self.equals.setdefault(field, {}).setdefault(value, []).append(position)
+            elif op == "in":
+                by_value = self.equals.setdefault(field, {})
+                for item in set(value):
+                    by_value.setdefault(item, []).append(position)
+            else:
+                pending_ranges.setdefault((field, op), []).append((value, position))
+
+        for key, entries in pending_ranges.items():
+            try:
+                entries.sort(key=lambda entry: entry[0])
+            except TypeError:
+                # Thresholds of mixed types cannot be ordered; check those rules every time
+                self.always.extend(position for _, position in entries)
+                continue
+            self.range[key] = ([value for value, _ in entries], [position for _, position in entries])
+
+        self.always.sort()
+
+    def _choose_anchor(self, conditions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Pick the most selective indexable condition: equals, then in, then a range"""
+        by_op = {}
+        for condition in conditions:
+            op, value = condition.get("op"), condition.get("value")
+            if condition.get("field") is None:
+                continue
+            if op == "equals" and _hashable(value) and value == value:
+                by_op.setdefault("equals", condition)
+            elif op == "in" and isinstance(value, (list, tuple, set)) and all(_hashable(v) for v in value):
+                by_op.setdefault("in", condition)
+            elif op in RANGE_OPS and value is not None and value == value:
+                by_op.setdefault("range", condition)
+        for kind in ("equals", "in", "range"):
+            if kind in by_op:
+                return by_op[kind]
+        return None
+
+    def candidates(self, data: Dict[str, Any]) -> List[int]:
+        """Positions of rules that may match, in priority order"""
+        hits = set(self.always)
+
+        for field, by_value in self.equals.items():
+            if field in data and _hashable(data[field]):
+                hits.update(by_value.get(data[field], ()))
+
+        for (field, op), (thresholds, positions) in self.range.items():
+            if field not in data:
+                continue
+            field_value = data[field]
+            if field_value is None or field_value != field_value:
+                continue
+            try:
+                if op == "gte":    # threshold <= value
+                    hits.update(positions[:bisect_right(thresholds, field_value)])
+                elif op == "gt":   # threshold < value
+                    hits.update(positions[:bisect_left(thresholds, field_value)])
+                elif op == "lte":  # threshold >= value
+                    hits.update(positions[bisect_left(thresholds, field_value):])
+                else:              # lt: threshold > value
+                    hits.update(positions[bisect_right(thresholds, field_value):])
+            except TypeError:
+                # Not comparable with the thresholds; let the full check decide
+                hits.update(positions)
+
+        return sorted(hits)
+
+    def first_match(
+        self,
+        data: Dict[str, Any],
+        evaluate_condition: Callable[[Dict[str, Any], Dict[str, Any]], bool]
+    ) -> Optional[Dict[str, Any]]:
+        """First rule in priority order whose conditions all hold"""
+        for position in self.candidates(data):
+            rule = self.rules[position]
+            if all(evaluate_condition(cond, data) for cond in rule.get("conditions", [])):
+                return rule
+        return None
@@ -0,0 +1,108 @@
+"""
+Named Rule Sets
+Per-tenant rule sets (one YAML file each, same schema as rules.yaml), compiled on
+first use and kept in a bounded LRU so requests never reload YAML or rebuild indexes
+"""
+
+import itertools
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+from rule_index import RuleIndex
+
+
+DEFAULT_RULE_SET = "default"
+
+# Rule set names map to file names, so keep them to a safe alphabet
+RULE_SET_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_compile_counter = itertools.count(1)
+
+
+class CompiledRuleSet:
+    """A loaded rules config with its rule index, ready for evaluate_rules"""
+
+    def __init__(self, name: str, rules_config: Dict[str, Any], version: Optional[int] = None, mtime: Optional[int] = None):
+        self.name = name
+        self.rules_config = rules_config
+        self.rule_index = RuleIndex(rules_config.get("rules", []))
+        # Unique per compile; part of the single-flight key so edits never share results
+        self.version = version if version is not None else next(_compile_counter)
+        self.mtime = mtime
+
+    def match_threshold(self) -> int:
+        return self.rules_config.get("thresholds", {}).get("fuzzy_match_threshold", 85)
+
+
+class RuleSetCache:
+    """
+    LRU of compiled rule sets loaded from `<directory>/<name>.yaml`. A cached
+    program is reused until its file's modification time changes.
+    """
+
+    def __init__(self, directory: str, capacity: int = 32):
+        self.directory = directory
+        self.capacity = capacity
+        self._programs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, name: str) -> str:
+        if not RULE_SET_NAME.match(name):
+            raise ValueError(f"Invalid rule set name '{name}'")
+        return os.path.join(self.directory, f"{name}.yaml")
+
+    def get(self, name: str) -> CompiledRuleSet:
+        """Compiled rule set by name (raises ValueError if it does not exist)"""
+        path = self.path(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise ValueError(f"Unknown rule set '{name}'")
+
+        with self._lock:
+            program = self._programs.get(name)
+            if program is not None and program.mtime == mtime:
+                self._programs.move_to_end(name)
+                self.hits += 1
+                return program
+
+        # Compile outside the lock; a concurrent compile of the same set is harmless
+        import yaml
+        with open(path, "r") as f:
+            rules_config = yaml.safe_load(f) or {}
+        rules_config.setdefault("thresholds", {})
+        rules_config.setdefault("rules", [])
+        program = CompiledRuleSet(name, rules_config, mtime=mtime)
+
+        with self._lock:
+            self.misses += 1
+            self._programs[name] = program
+            self._programs.move_to_end(name)
+            while len(self._programs) > self.capacity:
+                self._programs.popitem(last=False)
+                self.evictions += 1
+        return program
+
+    def available(self) -> List[str]:
+        """Names of the rule sets on disk"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = (entry[:-len(".yaml")] for entry in os.listdir(self.directory) if entry.endswith(".yaml"))
+        return sorted(name for name in names if RULE_SET_NAME.match(name))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = list(self._programs)
+        return {
+            "capacity": self.capacity,
+            "cached": cached,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,331 @@
+"""
+Sanctions Index
+Compiles sanctions/PEP lists into a binary, memory-mappable index so workers start
+instantly and share the same physical pages
+
+Build offline:
+    python sanctions_index.py data/sanctions.csv data/sanctions.idx
+"""
+
+import csv
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+
+INDEX_MAGIC = b"KYCSIDX1"
+INDEX_VERSION = 3
+
+# magic, version, entity_count, candidate_count, strings_size, sources_size
+HEADER = struct.Struct("<8sIIIII")
+# (offset, length) string refs for id, name, country, source, list_type, then candidate start/count
+ENTITY = struct.Struct("<12I")
+# (offset, byte length, character length) of a normalized candidate string (main name first, then aliases)
+CANDIDATE = struct.Struct("<III")
+# Per-candidate character histogram (see candidate_key), stored after the candidates
+KEY_SIZE = 32
+# The source files (see describe_sources) are recorded as JSON after the strings
+
+ENTITY_FIELDS = ("id", "name", "country", "source", "list_type")
+
+
+def normalize_name(name: Any) -> str:
+    """Normalize a name for fuzzy comparison (lowercase only: surrounding spaces count, as they always have)"""
+    return str(name).lower()
+
+
+def candidate_key(text: str) -> bytes:
+    """
+    Counts of the characters of a candidate in KEY_SIZE buckets (capped at 255). The counts two
+    strings share bound how many characters they can match, and so their fuzz.ratio.
+    """
+    counts = [0] * KEY_SIZE
+    for ch in text:
+        counts[ord(ch) % KEY_SIZE] += 1
+    return bytes(min(count, 255) for count in counts)
+
+
+def describe_sources(sources: Iterable[Tuple[str, str]]) -> List[List[Any]]:
+    """[format, file name, size, mtime_ns] per (format, path) source; size and mtime are None if it is missing"""
+    described = []
+    for fmt, path in sources:
+        try:
+            stat = os.stat(path)
+            described.append([fmt, os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            described.append([fmt, os.path.basename(path), None, None])
+    return described
+
+
+def _clean(value: Any, default: str = "UNKNOWN") -> str:
+    if value is None or value != value or str(value).strip() == "":
+        return default
+    return str(value).strip()
+
+
+def iter_csv_entities(path: str) -> Iterator[Dict[str, Any]]:
+    """Read entities from the sanctions CSV format (`|`-separated aliases)"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            aliases = row.get("aliases") or ""
+            yield {
+                "id": _clean(row.get("id"), ""),
+                "name": _clean(row.get("name"), ""),
+                "aliases": [alias for alias in aliases.split("|") if alias.strip()],
+                "country": _clean(row.get("country")),
+                "source": _clean(row.get("source")),
+                "list_type": _clean(row.get("list_type"))
+            }
+
+
+class SanctionsList:
+    """In-memory sanctions list; same interface as SanctionsIndex"""
+
+    def __init__(self, entities: Iterable[Dict[str, Any]] = ()):
+        self._entities = []
+        self._candidates = []
+        self._flat = []   # candidate number -> string
+        self._keys = None
+        for entity in entities:
+            self.add(entity)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SanctionsList":
+        return cls(iter_csv_entities(path))
+
+    def add(self, entity: Dict[str, Any]):
+        self._entities.append({field: entity.get(field, "UNKNOWN") for field in ENTITY_FIELDS})
+        candidates = [normalize_name(entity["name"])] + [normalize_name(alias) for alias in entity.get("aliases", [])]
+        self._candidates.append(candidates)
+        self._flat.extend(candidates)
+        self._keys = None
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def entity(self, i: int) -> Dict[str, Any]:
+        return self._entities[i]
+
+    def candidates(self, i: int) -> List[str]:
+        return self._candidates[i]
+
+    def candidate(self, c: int) -> str:
+        return self._flat[c]
+
+    def candidate_keys(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(character length, candidate_key histogram, entity index) per candidate, computed once"""
+        if self._keys is None:
+            self._keys = (
+                np.array([len(text) for text in self._flat], dtype=np.uint32),
+                np.frombuffer(b"".join(candidate_key(text) for text in self._flat), dtype=np.uint8).reshape(-1, KEY_SIZE),
+                np.repeat(np.arange(len(self._candidates), dtype=np.uint32), [len(c) for c in self._candidates])
+            )
+        return self._keys
+
+    def close(self):
+        pass
+
+
+class SanctionsIndex:
+    """Read-only, zero-copy view over a compiled index file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._entity_count, self._candidate_count, strings_size, sources_size = HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a sanctions index (version {INDEX_VERSION})")
+
+        self._entities_offset = HEADER.size
+        self._candidates_offset = self._entities_offset + self._entity_count * ENTITY.size
+        self._keys_offset = self._candidates_offset + self._candidate_count * CANDIDATE.size
+        self._strings_offset = self._keys_offset + self._candidate_count * KEY_SIZE
+        sources_offset = self._strings_offset + strings_size
+        if sources_offset + sources_size > len(self._mm):
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+        # describe_sources() of the files it was built from
+        self.sources = json.loads(self._mm[sources_offset:sources_offset + sources_size])
+        self._keys = None
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return str(self._mm[start:start + length], "utf-8")
+
+    def __len__(self) -> int:
+        return self._entity_count
+
+    def entity(self, i: int) -> Dict[str, Any]:
+        refs = ENTITY.unpack_from(self._mm, self._entities_offset + i * ENTITY.size)
+        return {field: self._text(refs[2 * n], refs[2 * n + 1]) for n, field in enumerate(ENTITY_FIELDS)}
+
+    def candidates(self, i: int) -> List[str]:
+        refs = ENTITY.unpack_from(self._mm, self._entities_offset + i * ENTITY.size)
+        start, count = refs[10], refs[11]
+        return [self.candidate(c) for c in range(start, start + count)]
+
+    def candidate(self, c: int) -> str:
+        offset, length, _ = CANDIDATE.unpack_from(self._mm, self._candidates_offset + c * CANDIDATE.size)
+        return self._text(offset, length)
+
+    def candidate_keys(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (character length, candidate_key histogram, entity index) per candidate. Lengths and
+        histograms are views of the mapped file; only the entity index array is built (once).
+        """
+        if self._keys is None:
+            refs = np.frombuffer(self._mm, dtype="<u4", count=self._candidate_count * 3, offset=self._candidates_offset)
+            keys = np.frombuffer(self._mm, dtype=np.uint8, count=self._candidate_count * KEY_SIZE, offset=self._keys_offset)
+            entities = np.frombuffer(self._mm, dtype="<u4", count=self._entity_count * 12, offset=self._entities_offset)
+            self._keys = (
+                refs.reshape(-1, 3)[:, 2],
+                keys.reshape(-1, KEY_SIZE),
+                np.repeat(np.arange(self._entity_count, dtype=np.uint32), entities.reshape(-1, 12)[:, 11])
+            )
+        return self._keys
+
+    def close(self):
+        self._keys = None  # numpy views must be released before the map can close
+        self._mm.close()
+
+
+class SanctionsIndexWriter:
+    """
+    Streams entities into an index file. Sections are spooled to temporary files,
+    so memory stays bounded by the number of distinct metadata strings, not list size.
+    """
+
+    def __init__(self, path: str, sources: Iterable[Tuple[str, str]] = ()):
+        """`sources` are the (format, path) files the entities come from, recorded for open_index"""
+        self.path = path
+        # Described before reading: a file changed during the build won't match afterwards
+        self._sources = json.dumps(describe_sources(sources)).encode("utf-8")
+        self._entities = tempfile.TemporaryFile()
+        self._candidates = tempfile.TemporaryFile()
+        self._keys = tempfile.TemporaryFile()
+        self._strings = tempfile.TemporaryFile()
+        self._strings_size = 0
+        self._interned = {}
+        self.entity_count = 0
+        self.candidate_count = 0
+
+    def _put(self, text: str, intern: bool = False) -> tuple:
+        if intern and text in self._interned:
+            return self._interned[text]
+        data = text.encode("utf-8")
+        ref = (self._strings_size, len(data))
+        self._strings.write(data)
+        self._strings_size += len(data)
+        if intern:
+            self._interned[text] = ref
+        return ref
+
+    def add(self, entity: Dict[str, Any]):
+        """Append one entity: {id, name, aliases, country, source, list_type}"""
+        refs = [
+            *self._put(str(entity.get("id", ""))),
+            *self._put(str(entity["name"])),
+            *self._put(str(entity.get("country", "UNKNOWN")), intern=True),
+            *self._put(str(entity.get("source", "UNKNOWN")), intern=True),
+            *self._put(str(entity.get("list_type", "UNKNOWN")), intern=True)
+        ]
+
+        candidates = [normalize_name(entity["name"])] + [normalize_name(a) for a in entity.get("aliases", [])]
+        start = self.candidate_count
+        for candidate in candidates:
+            self._candidates.write(CANDIDATE.pack(*self._put(candidate), len(candidate)))
+            self._keys.write(candidate_key(candidate))
+        self.candidate_count += len(candidates)
+
+        self._entities.write(ENTITY.pack(*refs, start, len(candidates)))
+        self.entity_count += 1
+
+    def close(self):
+        """Assemble the final file atomically (readers never see a partial index)"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(
+                INDEX_MAGIC, INDEX_VERSION, self.entity_count, self.candidate_count, self._strings_size, len(self._sources)
+            ))
+            for section in (self._entities, self._candidates, self._keys, self._strings):
+                section.seek(0)
+                shutil.copyfileobj(section, out)
+                section.close()
+            out.write(self._sources)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for section in (self._entities, self._candidates, self._keys, self._strings):
+                section.close()
+
+
+def build_index(entities: Iterable[Dict[str, Any]], path: str, sources: Iterable[Tuple[str, str]] = ()) -> int:
+    """Compile entities (read from the (format, path) `sources`) into an index file, returning the entity count"""
+    with SanctionsIndexWriter(path, sources) as writer:
+        for entity in entities:
+            writer.add(entity)
+    return writer.entity_count
+
+
+def _sources_mismatch(recorded: List[List[Any]], current: List[List[Any]]) -> Optional[str]:
+    """Why an index built from `recorded` sources can't stand in for `current` ones (None if it can)"""
+    if [source[:2] for source in recorded] != [source[:2] for source in current]:
+        built_from = ", ".join(f"{fmt}:{name}" for fmt, name, *_ in recorded) or "unknown sources"
+        return f"it was built from {built_from}"
+    for (_, name, size, mtime), (_, _, current_size, current_mtime) in zip(recorded, current):
+        # A missing file can't be checked: the index is then shipped on its own
+        if current_size is not None and (size, mtime) != (current_size, current_mtime):
+            return f"{name} changed since it was built"
+    return None
+
+
+def open_index(index_path: Optional[str], sources: Iterable[Tuple[str, str]]) -> Optional[SanctionsIndex]:
+    """The prebuilt index if it was built from these (format, path) sources as they are now, else None"""
+    if not index_path or not os.path.exists(index_path):
+        return None
+    try:
+        index = SanctionsIndex(index_path)
+    except Exception as e:
+        print(f"Warning: Could not open sanctions index: {e}")
+        return None
+    reason = _sources_mismatch(index.sources, describe_sources(sources))
+    if reason is not None:
+        print(f"Warning: Not using {index_path}: {reason}; loading the sources instead (rebuild the index)")
+        index.close()
+        return None
+    return index
+
+
+def open_sanctions(csv_path: str, index_path: Optional[str] = None):
+    """
+    Open the prebuilt index when it was built from this CSV (unchanged since),
+    otherwise parse the CSV into memory
+    """
+    index = open_index(index_path, [("csv", csv_path)])
+    return index if index is not None else SanctionsList.from_csv(csv_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python sanctions_index.py <sanctions.csv> <output.idx>")
+        sys.exit(1)
+    count = build_index(iter_csv_entities(sys.argv[1]), sys.argv[2], [("csv", sys.argv[1])])
+    print(f"Wrote {count} entities to {sys.argv[2]}")
@@ -1,7 +1,7 @@
 // index.tsx
 // Upload & screening UI (placeholder)
 
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import Head from 'next/head';
 import UploadCard from '../components/UploadCard';
 import AnalystPanel from '../components/AnalystPanel';
@@ -17,6 +17,40 @@ export default function Home() {
   const [showTeachModal, setShowTeachModal] = useState(false);
   const [activeTab, setActiveTab] = useState<'upload' | 'results' | 'metrics'>('upload');
 
+  // Live metrics: server pushes a snapshot, then only the fields that changed
+  useEffect(() => {
+    const source = new EventSource('http://localhost:8000/metrics/stream');
+
+    source.addEventListener('snapshot', (event: MessageEvent) => {
+      setMetrics(JSON.parse(event.data));
+    });
+
+    source.addEventListener('delta', (event: MessageEvent) => {
+      const delta = JSON.parse(event.data);
+      setMetrics((current: any) => {
+        const next = { ...(current || {}) };
+        for (const [key, value] of Object.entries(delta)) {
+          if (value && typeof value === 'object') {
+            const nested = { ...(next[key] || {}) };
+            for (const [nestedKey, nestedValue] of Object.entries(value as any)) {
+              if (nestedValue === null) {
+                delete nested[nestedKey];
+              } else {
+                nested[nestedKey] = nestedValue;
+              }
+            }
+            next[key] = nested;
+          } else {
+            next[key] = value;
+          }
+        }
+        return next;
+      });
+    });
+
+    return () => source.close();
+  }, []);
+
   const handleUploadComplete = (data: any) => {
     setResults(data.results || []);
     setMetrics(data.metrics);
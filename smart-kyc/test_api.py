@@ -6,9 +6,14 @@ Run this after starting the backend to verify all endpoints work
 
 import requests
 import json
+import os
+import random
+import string
 import sys
 
 BASE_URL = "http://localhost:8000"
+# In-process checks of backend modules (no server needed)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
 
 def test_health():
     """Test health endpoint"""
@@ -129,6 +134,167 @@ def test_upload_csv():
         print("⚠️  CSV file not found, skipping test")
         return True
 
+def test_draft_reports():
+    """Test bulk report drafting (NDJSON stream)"""
+    print("\n🔍 Testing /draft-reports endpoint...")
+    payload = {
+        "cases": [{"applicant": {"name": "Vladimir Petrov", "country": "Russia"}, "decision": "BLOCK"}],
+        "format": "ndjson"
+    }
+    response = requests.post(f"{BASE_URL}/draft-reports", json=payload)
+    if response.status_code == 200:
+        print("✅ Bulk report endpoint working")
+        reports = [json.loads(line) for line in response.text.splitlines() if line]
+        print(f"   Reports drafted: {len(reports)}")
+        return True
+    else:
+        print(f"❌ Bulk reports failed: {response.status_code}")
+        return False
+
+def test_backtest_edit_in_place():
+    """Test backtesting a rule edited without changing its id"""
+    print("\n🔍 Testing /backtest endpoint (rule edited in place)...")
+    features = "name,country,sanctions_match_score,pep_match,sanctions_match,adverse_media_count\n" \
+               "Test Person,Iran,0,False,False,0\n"
+    rules = [{
+        "id": "high_risk_country",
+        "description": "Block if from high-risk country",
+        "enabled": True,
+        "priority": 3,
+        "conditions": [{"field": "country", "op": "in", "value": ["North Korea", "Iran", "Syria", "Sudan"]}],
+        "outcome": "BLOCK"
+    }]
+    files = {"file": ("features.csv", features, "text/csv")}
+    response = requests.post(f"{BASE_URL}/backtest", data={"rules": json.dumps(rules)}, files=files)
+    if response.status_code != 200:
+        print(f"❌ Backtest failed: {response.status_code}")
+        return False
+    data = response.json()
+    rows = data.get("changed_rows", [])
+    if data.get("decision_changed") == 1 and data.get("changed") == 1 and len(rows) == 1 \
+            and rows[0]["candidate_decision"] == "BLOCK":
+        print("✅ Backtest reports rows changed by an in-place rule edit")
+        print(f"   Transitions: {data.get('transitions')}")
+        return True
+    print(f"❌ Backtest missed the in-place edit: {data}")
+    return False
+
+def test_match_candidates_ranking():
+    """Test top-k ranking, tie-breaking and matched aliases against a brute-force scan of the demo list"""
+    print("\n🔍 Testing /match-candidates ranking (k=3, aliases)...")
+    sys.path.insert(0, BACKEND_DIR)
+    from fuzzywuzzy import fuzz
+    from sanctions_index import iter_csv_entities, normalize_name
+
+    entities = list(iter_csv_entities(os.path.join(BACKEND_DIR, "data", "sanctions.csv")))
+    for name in ["Vlad Petrov", "J. Smith", "Ahmed Rashid", "Hassan Santos"]:
+        response = requests.post(f"{BASE_URL}/match-candidates", json={"name": name, "k": 3, "threshold": 0})
+        if response.status_code != 200:
+            print(f"❌ Match candidates failed: {response.status_code}")
+            return False
+        # Best alias per entity (earlier alias wins ties), then score desc with earlier entities first
+        query = normalize_name(name)
+        scored = []
+        for i, entity in enumerate(entities):
+            best = max(
+                ((fuzz.ratio(query, normalize_name(alias)), -n, alias) for n, alias in enumerate([entity["name"], *entity["aliases"]])),
+            )
+            if best[0] > 0:
+                scored.append((-best[0], i, normalize_name(best[2])))
+        expected = [(entities[i]["name"], -score, alias) for score, i, alias in sorted(scored)[:3]]
+        got = [(c["matched_entity"], c["match_score"], c["matched_alias"]) for c in response.json()["candidates"]]
+        if got != expected or [c["rank"] for c in response.json()["candidates"]] != list(range(1, len(got) + 1)):
+            print(f"❌ Ranking for '{name}' differs: {got} != {expected}")
+            return False
+        print(f"   {name}: {got}")
+    first = requests.post(f"{BASE_URL}/match-candidates", json={"name": "Vlad Petrov", "k": 3}).json()["candidates"][0]
+    if (first["matched_entity"], first["matched_alias"], first["match_score"]) != ("Vladimir Petrov", "vlad petrov", 100):
+        print(f"❌ Alias match not ranked first: {first}")
+        return False
+    print("✅ Top-k ranking matches a brute-force scan")
+    return True
+
+def test_customer_index_candidates():
+    """Test that delta re-screening candidates include every customer a brute-force scan matches"""
+    print("\n🔍 Testing customer index candidates (in-process)...")
+    sys.path.insert(0, BACKEND_DIR)
+    from fuzzywuzzy import fuzz
+    from rescreen import CustomerIndex
+
+    rng = random.Random(42)
+    def random_name():
+        return " ".join("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(2))
+
+    names = [random_name() for _ in range(3000)]
+    index = CustomerIndex()
+    for i, name in enumerate(names):
+        index.add({"id": i + 1, "name": name, "name_norm": name, "decision": "APPROVE"})
+    queries = [random_name() for _ in range(10)] + [name[:-1] + "x" for name in rng.sample(names, 10)]
+    for threshold in (60, 75, 85):
+        found = 0
+        for query in queries:
+            candidates = index.candidates(query, threshold)
+            expected = {slot for slot, name in enumerate(names) if fuzz.ratio(query, name) >= threshold}
+            if not expected <= candidates:
+                print(f"❌ Missed matches for '{query}' at {threshold}: {sorted(expected - candidates)}")
+                return False
+            found += len(candidates)
+        print(f"   Threshold {threshold}: {found / len(queries):.1f} candidates per query of {len(names)}")
+    print("✅ Candidate sets cover all brute-force matches")
+    return True
+
+def test_rule_index_matches_linear_scan():
+    """Test that the rule index picks the same rule as scanning every rule in priority order"""
+    print("\n🔍 Testing rule index against a linear scan (in-process)...")
+    sys.path.insert(0, BACKEND_DIR)
+    from pathway_engine import PathwayEngine
+    from rule_index import RuleIndex
+
+    engine = PathwayEngine(lazy=True)
+    rng = random.Random(7)
+    countries = ["Iran", "Syria", "Russia", "USA", "UK", "Brazil"]
+    def random_condition():
+        field = rng.choice(["country", "sanctions_match_score", "adverse_media_count", "pep_match"])
+        if field == "country":
+            op = rng.choice(["equals", "in", "contains"])
+            value = rng.sample(countries, 2) if op == "in" else rng.choice(countries)
+        elif field == "pep_match":
+            op, value = "equals", rng.choice([True, False])
+        else:
+            op, value = rng.choice(["gte", "gt", "lte", "lt", "equals"]), rng.randint(0, 100)
+        return {"field": field, "op": op, "value": value}
+
+    compared = raised = 0
+    for _ in range(200):
+        rules = [{
+            "id": f"r{i}",
+            "enabled": rng.random() > 0.1,
+            "priority": rng.randint(1, 10),
+            "conditions": [random_condition() for _ in range(rng.randint(0, 3))],
+            "outcome": rng.choice(["APPROVE", "REVIEW", "BLOCK"])
+        } for i in range(rng.randint(1, 30))]
+        index = RuleIndex(rules)
+        ordered = [rule for rule in sorted(rules, key=lambda x: x.get("priority", 999)) if rule.get("enabled", True)]
+        for _ in range(20):
+            data = {
+                "country": rng.choice(countries),
+                "sanctions_match_score": rng.choice([rng.randint(0, 100), None]),
+                "adverse_media_count": rng.randint(0, 100),
+                "pep_match": rng.choice([True, False])
+            }
+            try:
+                expected = next((rule for rule in ordered
+                                 if all(engine.evaluate_condition(c, data) for c in rule["conditions"])), None)
+            except TypeError:
+                raised += 1  # the scan fails here; the index skips the rule instead
+                continue
+            if index.first_match(data, engine.evaluate_condition) is not expected:
+                print(f"❌ Rule index disagrees with the scan for {data}")
+                return False
+            compared += 1
+    print(f"✅ Rule index matches the linear scan ({compared} cases, {raised} where the scan raises skipped)")
+    return True
+
 def main():
     """Run all tests"""
     print("=" * 60)
@@ -142,7 +308,12 @@ def main():
         test_screen_applicant,
         test_adverse_media,
         test_teach_rule,
-        test_upload_csv
+        test_upload_csv,
+        test_draft_reports,
+        test_backtest_edit_in_place,
+        test_match_candidates_ranking,
+        test_customer_index_candidates,
+        test_rule_index_matches_linear_scan
     ]
     
     passed = 0